@@ -2,6 +2,7 @@ from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 
 from alembic import context
 
@@ -33,6 +34,23 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# posts and votes are partitioned, their children (posts_pYYYYMM, votes_pNN)
+# are created at runtime and aren't in the metadata. Without this autogenerate
+# would drop them.
+PARTITIONS = text("SELECT inhrelid::regclass::text FROM pg_inherits")
+
+
+def skip_partitions(connection):
+    partitions = set(connection.execute(PARTITIONS).scalars())
+
+    def include_object(object, name, type_, reflected, compare_to):
+        table = name if type_ == "table" else getattr(object, "table", None)
+        table = getattr(table, "name", table)
+        return not (reflected and table in partitions)
+
+    return include_object
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -71,7 +89,11 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=skip_partitions(connection),
+        )
 
         with context.begin_transaction():
             context.run_migrations()
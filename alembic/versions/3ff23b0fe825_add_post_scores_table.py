@@ -0,0 +1,48 @@
+"""add post_scores table
+
+Revision ID: 3ff23b0fe825
+Revises: 9ffc5fca790a
+Create Date: 2026-10-18 13:02:11.482915
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3ff23b0fe825"
+down_revision: Union[str, None] = "9ffc5fca790a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # filled by apps/trending.py, run `python -m apps.manage refresh-trending`
+    # once after upgrading to populate it
+    op.create_table(
+        "post_scores",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Double(), nullable=False),
+        sa.Column("vote_count", sa.Integer(), nullable=False),
+        sa.Column(
+            "refreshed_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["post_id"], ["posts.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("post_id"),
+    )
+    op.create_index(
+        "ix_post_scores_score_post_id",
+        "post_scores",
+        [sa.text("score DESC"), sa.text("post_id DESC")],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_post_scores_score_post_id", table_name="post_scores")
+    op.drop_table("post_scores")
@@ -0,0 +1,41 @@
+"""add vote_count to posts
+
+Revision ID: 89be58d2bbf8
+Revises: 6c01bd44fec2
+Create Date: 2026-10-18 11:30:12.481903
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "89be58d2bbf8"
+down_revision: Union[str, None] = "6c01bd44fec2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "posts",
+        sa.Column(
+            "vote_count", sa.Integer(), server_default=sa.text("0"), nullable=False
+        ),
+    )
+    # backfill from the existing votes, posts without votes keep the default 0
+    op.execute(
+        """
+        UPDATE posts
+        SET vote_count = counts.n
+        FROM (SELECT post_id, count(*) AS n FROM votes GROUP BY post_id) AS counts
+        WHERE posts.id = counts.post_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "vote_count")
@@ -0,0 +1,65 @@
+"""add posts full text search
+
+Adds posts.search_vector as a STORED generated column. Adding it rewrites the
+whole posts table under an ACCESS EXCLUSIVE lock, blocking reads and writes on
+posts until it finishes, so run it in a maintenance window on large tables. The
+GIN index is then built concurrently, outside the migration transaction.
+
+Revision ID: 9ffc5fca790a
+Revises: a94cc8e3c0f6
+Create Date: 2026-10-18 12:21:40.816270
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9ffc5fca790a"
+down_revision: Union[str, None] = "a94cc8e3c0f6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# keep in step with models.SEARCH_VECTOR
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    # rewrites posts under ACCESS EXCLUSIVE, see the docstring
+    op.add_column(
+        "posts",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR, persisted=True),
+            nullable=False,
+        ),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_posts_search_vector",
+            "posts",
+            ["search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_posts_search_vector",
+            table_name="posts",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("posts", "search_vector")
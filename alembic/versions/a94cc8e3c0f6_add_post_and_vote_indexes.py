@@ -0,0 +1,70 @@
+"""add post and vote indexes
+
+Revision ID: a94cc8e3c0f6
+Revises: 89be58d2bbf8
+Create Date: 2026-10-18 11:42:57.103344
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a94cc8e3c0f6"
+down_revision: Union[str, None] = "89be58d2bbf8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# CONCURRENTLY can't run inside a transaction, so each statement runs in an
+# autocommit block. A failed concurrent build leaves an INVALID index behind,
+# drop it and re-run the migration. users.email already has an index through
+# its unique constraint, so login lookups need nothing new.
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_votes_post_id",
+            "votes",
+            ["post_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_posts_owner_id",
+            "posts",
+            ["owner_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_posts_created_at_id",
+            "posts",
+            [sa.text("created_at DESC"), sa.text("id DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_posts_created_at_id",
+            table_name="posts",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_posts_owner_id",
+            table_name="posts",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_votes_post_id",
+            table_name="votes",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
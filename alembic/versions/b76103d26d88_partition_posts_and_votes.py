@@ -0,0 +1,259 @@
+"""partition posts and votes
+
+posts becomes range partitioned by month of created_at, votes hash partitioned
+by post_id. Both tables are copied under ACCESS EXCLUSIVE, take a maintenance
+window on large databases. Needs PostgreSQL 13+.
+
+Revision ID: b76103d26d88
+Revises: 3ff23b0fe825
+Create Date: 2026-10-18 14:05:52.118364
+
+"""
+
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b76103d26d88"
+down_revision: Union[str, None] = "3ff23b0fe825"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# posts is range partitioned by month of created_at (posts_pYYYYMM, UTC months,
+# see apps/partitions.py for creating and archiving them), votes is hash
+# partitioned by post_id into VOTE_PARTITIONS tables (votes_pNN).
+#
+# A unique key on a partitioned table must contain the partition key, so the
+# primary key of posts becomes (id, created_at) and nothing can reference
+# posts(id) anymore. post_ids, a plain table with one row per post, takes its
+# place: a trigger on posts inserts and deletes its rows, its primary key keeps
+# ids unique, and votes and post_scores reference it with ON DELETE CASCADE
+# foreign keys. id and created_at can't be updated, moving a row to another
+# partition would run the delete trigger and cascade its votes away.
+#
+# Queries by id alone (post by id, vote_count updates, the vote batch row locks)
+# can't be pruned to one partition, they probe ix_posts_id in every partition,
+# one index lookup per month kept. Archive old months (apps/partitions.py) to
+# keep that number bounded.
+
+VOTE_PARTITIONS = 16
+MONTHS_AHEAD = 3
+
+
+def add_months(month: date, n: int) -> date:
+    years, index = divmod(month.month - 1 + n, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def create_post_partitions(first: date, last: date):
+    month = first
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE posts_p{month:%Y%m} PARTITION OF posts_partitioned"
+            f" FOR VALUES FROM ('{month} 00:00+00') TO ('{add_months(month, 1)} 00:00+00')"
+        )
+        month = add_months(month, 1)
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    today = datetime.now(timezone.utc).date()
+    oldest = conn.execute(
+        sa.text("SELECT min(created_at) AT TIME ZONE 'UTC' FROM posts")
+    ).scalar()
+    first = (oldest.date() if oldest else today).replace(day=1)
+
+    # the ids votes and post_scores reference from now on
+    op.execute(
+        """
+        CREATE TABLE post_ids (id integer NOT NULL, CONSTRAINT post_ids_pkey PRIMARY KEY (id))
+        """
+    )
+    op.execute("INSERT INTO post_ids SELECT id FROM posts")
+    op.drop_constraint("votes_post_id_fkey", "votes", type_="foreignkey")
+    op.drop_constraint("post_scores_post_id_fkey", "post_scores", type_="foreignkey")
+    op.create_foreign_key(
+        "post_scores_post_id_fkey",
+        "post_scores",
+        "post_ids",
+        ["post_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+
+    # posts: copy into a partitioned twin that keeps the id sequence
+    op.execute("ALTER SEQUENCE posts_id_seq OWNED BY NONE")
+    op.execute(
+        """
+        CREATE TABLE posts_partitioned (
+            LIKE posts INCLUDING DEFAULTS INCLUDING GENERATED,
+            CONSTRAINT posts_partitioned_pkey PRIMARY KEY (id, created_at),
+            CONSTRAINT posts_owner_id_fkey FOREIGN KEY (owner_id)
+                REFERENCES users (id) ON DELETE CASCADE
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    create_post_partitions(first, add_months(today.replace(day=1), MONTHS_AHEAD))
+    op.execute(
+        """
+        INSERT INTO posts_partitioned
+            (id, title, content, published, created_at, owner_id, vote_count)
+        SELECT id, title, content, published, created_at, owner_id, vote_count
+        FROM posts
+        """
+    )
+    op.drop_table("posts")
+    op.rename_table("posts_partitioned", "posts")
+    op.execute("ALTER INDEX posts_partitioned_pkey RENAME TO posts_pkey")
+    op.execute("ALTER SEQUENCE posts_id_seq OWNED BY posts.id")
+    # partitioned indexes can't be built concurrently
+    op.create_index("ix_posts_id", "posts", ["id"])
+    op.create_index(
+        "ix_posts_created_at_id",
+        "posts",
+        [sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index("ix_posts_owner_id", "posts", ["owner_id"])
+    op.create_index(
+        "ix_posts_search_vector", "posts", ["search_vector"], postgresql_using="gin"
+    )
+
+    # votes
+    op.execute(
+        """
+        CREATE TABLE votes_partitioned (
+            LIKE votes,
+            CONSTRAINT votes_partitioned_pkey PRIMARY KEY (user_id, post_id),
+            CONSTRAINT votes_user_id_fkey FOREIGN KEY (user_id)
+                REFERENCES users (id) ON DELETE CASCADE,
+            CONSTRAINT votes_post_id_fkey FOREIGN KEY (post_id)
+                REFERENCES post_ids (id) ON DELETE CASCADE
+        ) PARTITION BY HASH (post_id)
+        """
+    )
+    for remainder in range(VOTE_PARTITIONS):
+        op.execute(
+            f"CREATE TABLE votes_p{remainder:02d} PARTITION OF votes_partitioned"
+            f" FOR VALUES WITH (MODULUS {VOTE_PARTITIONS}, REMAINDER {remainder})"
+        )
+    op.execute("INSERT INTO votes_partitioned SELECT user_id, post_id FROM votes")
+    op.drop_table("votes")
+    op.rename_table("votes_partitioned", "votes")
+    op.execute("ALTER INDEX votes_partitioned_pkey RENAME TO votes_pkey")
+    op.create_index("ix_votes_post_id", "votes", ["post_id"])
+
+    op.execute(
+        """
+        CREATE FUNCTION posts_track_id() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO post_ids (id) VALUES (NEW.id);
+                RETURN NEW;
+            END IF;
+            -- cascades to votes and post_scores
+            DELETE FROM post_ids WHERE id = OLD.id;
+            RETURN OLD;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER posts_track_id AFTER INSERT OR DELETE ON posts
+        FOR EACH ROW EXECUTE FUNCTION posts_track_id()
+        """
+    )
+    op.execute(
+        """
+        CREATE FUNCTION posts_fixed_key() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF NEW.id <> OLD.id OR NEW.created_at <> OLD.created_at THEN
+                RAISE feature_not_supported
+                    USING MESSAGE = 'posts.id and posts.created_at can''t change';
+            END IF;
+            RETURN NEW;
+        END
+        $$
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER posts_fixed_key BEFORE UPDATE OF id, created_at ON posts
+        FOR EACH ROW EXECUTE FUNCTION posts_fixed_key()
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER posts_fixed_key ON posts")
+    op.execute("DROP FUNCTION posts_fixed_key()")
+    op.execute("DROP TRIGGER posts_track_id ON posts")
+    op.execute("DROP FUNCTION posts_track_id()")
+
+    op.execute(
+        """
+        CREATE TABLE posts_unpartitioned (
+            LIKE posts INCLUDING DEFAULTS INCLUDING GENERATED,
+            CONSTRAINT posts_unpartitioned_pkey PRIMARY KEY (id),
+            CONSTRAINT posts_owner_id_fkey FOREIGN KEY (owner_id)
+                REFERENCES users (id) ON DELETE CASCADE
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO posts_unpartitioned
+            (id, title, content, published, created_at, owner_id, vote_count)
+        SELECT id, title, content, published, created_at, owner_id, vote_count
+        FROM posts
+        """
+    )
+    op.execute("ALTER SEQUENCE posts_id_seq OWNED BY NONE")
+    op.drop_table("posts")
+    op.rename_table("posts_unpartitioned", "posts")
+    op.execute("ALTER INDEX posts_unpartitioned_pkey RENAME TO posts_pkey")
+    op.execute("ALTER SEQUENCE posts_id_seq OWNED BY posts.id")
+    op.create_index(
+        "ix_posts_created_at_id",
+        "posts",
+        [sa.text("created_at DESC"), sa.text("id DESC")],
+    )
+    op.create_index("ix_posts_owner_id", "posts", ["owner_id"])
+    op.create_index(
+        "ix_posts_search_vector", "posts", ["search_vector"], postgresql_using="gin"
+    )
+
+    op.execute(
+        """
+        CREATE TABLE votes_unpartitioned (
+            LIKE votes,
+            CONSTRAINT votes_unpartitioned_pkey PRIMARY KEY (user_id, post_id),
+            CONSTRAINT votes_user_id_fkey FOREIGN KEY (user_id)
+                REFERENCES users (id) ON DELETE CASCADE,
+            CONSTRAINT votes_post_id_fkey FOREIGN KEY (post_id)
+                REFERENCES posts (id) ON DELETE CASCADE
+        )
+        """
+    )
+    op.execute("INSERT INTO votes_unpartitioned SELECT user_id, post_id FROM votes")
+    op.drop_table("votes")
+    op.rename_table("votes_unpartitioned", "votes")
+    op.execute("ALTER INDEX votes_unpartitioned_pkey RENAME TO votes_pkey")
+    op.create_index("ix_votes_post_id", "votes", ["post_id"])
+
+    op.drop_constraint("post_scores_post_id_fkey", "post_scores", type_="foreignkey")
+    op.drop_table("post_ids")
+    op.create_foreign_key(
+        "post_scores_post_id_fkey",
+        "post_scores",
+        "posts",
+        ["post_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
@@ -0,0 +1,195 @@
+import csv
+import io
+import re
+from collections.abc import AsyncIterator
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import Select, select
+from . import models, schemas
+from .database import async_engine
+
+# Incremental parsing for POST /posts/bulk. Bodies are consumed as they stream
+# in and only one element (or NDJSON line) is ever buffered, so memory stays
+# flat however large the upload is.
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+
+class JSONArrayItems:
+    # splits a top-level JSON array into the raw bytes of its elements
+    _structural = re.compile(rb'["\[\]{},]')
+    # rest of a string after its opening quote, skipping escaped characters
+    _string_tail = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+
+    def __init__(self):
+        self.buffer = b""
+        self.pos = 0
+        self.depth = 0
+        self.start: int | None = None
+        self.count = 0
+        self.closed = False
+
+    def feed(self, data: bytes) -> list[bytes]:
+        if self.closed:
+            if data.strip():
+                raise ValueError("unexpected data after the JSON array")
+            return []
+        self.buffer += data
+        if self.start is None and self.buffer.lstrip()[:1] not in (b"", b"["):
+            raise ValueError("expected a JSON array")
+        items = []
+        while not self.closed:
+            match = self._structural.search(self.buffer, self.pos)
+            if not match:
+                self.pos = len(self.buffer)
+                break
+            char, i = match.group(), match.start()
+            if self.depth == 0 and (char != b"[" or self.buffer[:i].strip()):
+                raise ValueError("expected a JSON array")
+            if char == b'"':
+                tail = self._string_tail.match(self.buffer, i + 1)
+                if not tail:
+                    # string continues in the next chunk, rescan it from the quote
+                    self.pos = i
+                    break
+                self.pos = tail.end()
+                continue
+            self.pos = i + 1
+            if char in b"[{":
+                self.depth += 1
+                if self.depth == 1:
+                    self.start = self.pos
+            elif char in b"]}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self._emit(items, i, last=True)
+                    self.closed = True
+                    self.buffer = self.buffer[self.pos :]
+                    if self.buffer.strip():
+                        raise ValueError("unexpected data after the JSON array")
+                    return items
+            elif char == b"," and self.depth == 1:
+                self._emit(items, i)
+                self.start = self.pos
+        if self.start:
+            # drop everything already emitted
+            self.buffer = self.buffer[self.start :]
+            self.pos -= self.start
+            self.start = 0
+        return items
+
+    def _emit(self, items: list[bytes], end: int, last: bool = False):
+        element = self.buffer[self.start : end].strip()
+        if element:
+            items.append(element)
+            self.count += 1
+        elif not (last and self.count == 0):
+            # only [] may be empty, [1,,2] and [1,] are malformed
+            raise ValueError(f"missing JSON array element at index {self.count}")
+
+    def close(self):
+        if self.start is None:
+            raise ValueError("expected a JSON array")
+        if not self.closed:
+            raise ValueError("truncated JSON array")
+
+
+class NDJSONItems:
+    def __init__(self):
+        self.buffer = b""
+
+    def feed(self, data: bytes) -> list[bytes]:
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split(b"\n")
+        return [line for line in lines if line.strip()]
+
+    def close(self):
+        if self.buffer.strip():
+            return [self.buffer]
+        return []
+
+
+async def parse_items(
+    stream: AsyncIterator[bytes], content_type: str
+) -> AsyncIterator[tuple[int, schemas.PostCreate | None, str | None]]:
+    # yields (index, post, None) for valid items and (index, None, error) otherwise
+    ndjson = content_type.split(";")[0].strip().lower() in NDJSON_TYPES
+    splitter = NDJSONItems() if ndjson else JSONArrayItems()
+    index = 0
+    async for data in stream:
+        for raw in splitter.feed(data):
+            yield index, *validate(raw)
+            index += 1
+    for raw in splitter.close() or ():
+        yield index, *validate(raw)
+        index += 1
+
+
+def validate(raw: bytes) -> tuple[schemas.PostCreate | None, str | None]:
+    try:
+        return schemas.PostCreate.model_validate(orjson.loads(raw)), None
+    except orjson.JSONDecodeError as e:
+        return None, f"invalid JSON: {e}"
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(map(str, err['loc'])) or 'item'}: {err['msg']}"
+            for err in e.errors()
+        )
+
+
+async def copy_posts(driver_connection, owner_id: int, posts: list[schemas.PostCreate]):
+    # one chunk, one transaction: a failed COPY loses only its own chunk
+    async with driver_connection.transaction():
+        async with driver_connection.cursor() as cursor:
+            async with cursor.copy(
+                "COPY posts (title, content, published, owner_id) FROM STDIN"
+            ) as copy:
+                for post in posts:
+                    await copy.write_row(
+                        (post.title, post.content, post.published, owner_id)
+                    )
+
+
+# the caller's own rows: posts they wrote, votes they cast
+EXPORTS = {
+    "posts": lambda user_id: select(
+        models.Post.id,
+        models.Post.title,
+        models.Post.content,
+        models.Post.published,
+        models.Post.created_at,
+        models.Post.owner_id,
+        models.Post.vote_count,
+    )
+    .where(models.Post.owner_id == user_id)
+    .order_by(models.Post.id),
+    "votes": lambda user_id: select(models.Vote.user_id, models.Vote.post_id)
+    .where(models.Vote.user_id == user_id)
+    .order_by(models.Vote.post_id),
+}
+
+
+async def export_rows(
+    query: Select, format: str, batch_size: int
+) -> AsyncIterator[bytes]:
+    # Runs inside the response body, so it owns its connection: request
+    # dependencies are torn down before streaming starts. stream() opens a
+    # psycopg server-side cursor and yield_per pulls batch_size rows per fetch,
+    # so the first bytes go out after one batch and memory stays at one batch.
+    async with async_engine.connect() as conn:
+        result = await conn.stream(query.execution_options(yield_per=batch_size))
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(result.keys())
+            async for rows in result.partitions():
+                writer.writerows(rows)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            async for rows in result.mappings().partitions():
+                yield b"".join(
+                    orjson.dumps(dict(row), option=orjson.OPT_UTC_Z) + b"\n"
+                    for row in rows
+                )
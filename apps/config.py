@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic_settings import BaseSettings
 
 
@@ -11,6 +12,151 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRATION_MINUTES: int
+    # "db" loads the user row on every authenticated request, "stateless" trusts
+    # the id/email claims in the token and only hits the db for older tokens
+    # that lack them, caching those rows for AUTH_USER_CACHE_TTL seconds
+    AUTH_MODE: Literal["db", "stateless"] = "db"
+    AUTH_USER_CACHE_TTL: float = 60
+    AUTH_USER_CACHE_SIZE: int = 10_000
+    # decoded tokens kept by sha256 of the token, 0 turns the cache off
+    JWT_CACHE_SIZE: int = 10_000
+
+    # page size used by GET /posts when the client doesn't send a limit,
+    # and the hard cap applied to whatever the client does send
+    POSTS_PAGE_SIZE_DEFAULT: int = 10
+    POSTS_PAGE_SIZE_MAX: int = 100
+
+    # serve the routers from apps/routers/aio on an AsyncEngine instead of the
+    # sync routers on the threadpool
+    DATABASE_ASYNC: bool = False
+
+    # connection pool, applied to both the sync and the async engine
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    # seconds to wait for a free connection before failing the request
+    DATABASE_POOL_TIMEOUT: float = 30
+    # seconds before a connection is replaced, -1 keeps connections forever
+    DATABASE_POOL_RECYCLE: int = 1800
+    # test connections on checkout so failovers don't surface as request errors
+    DATABASE_POOL_PRE_PING: bool = True
+    # transaction pooling in PgBouncer can't keep server-side prepared statements
+    DATABASE_PGBOUNCER: bool = False
+
+    # read replicas for the read-only GET routes, a JSON list of postgresql://
+    # URLs with the same credentials style as the primary. Empty sends every
+    # query to the primary. Replicas are checked every
+    # DATABASE_REPLICA_CHECK_INTERVAL seconds and skipped while unreachable or
+    # more than DATABASE_REPLICA_MAX_LAG seconds behind, 0 ignores lag.
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_REPLICA_BALANCE: Literal["round_robin", "least_connections"] = (
+        "round_robin"
+    )
+    DATABASE_REPLICA_CHECK_INTERVAL: float = 5
+    DATABASE_REPLICA_MAX_LAG: float = 10
+    DATABASE_REPLICA_CONNECT_TIMEOUT: int = 3
+
+    # bcrypt runs in its own process pool so logins don't hold the GIL. Once
+    # workers + queue jobs are in flight new ones get a 503 with Retry-After.
+    # Hashes with a different cost are upgraded on the next successful login.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+    PASSWORD_HASH_RETRY_AFTER: int = 1
+
+    # serialized GET /posts and GET /posts/{id} responses. "memory" is per
+    # process, use "redis" when running several workers. redis needs the
+    # optional redis package. With replicas, a miss reads the primary only if a
+    # write touched the page within DATABASE_REPLICA_MAX_LAG +
+    # DATABASE_REPLICA_CHECK_INTERVAL seconds, every miss does when MAX_LAG is 0.
+    RESPONSE_CACHE_BACKEND: Literal["memory", "redis", "none"] = "memory"
+    RESPONSE_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    RESPONSE_CACHE_TTL: int = 30
+    RESPONSE_CACHE_SIZE: int = 10_000
+
+    # most {post_id, dir} items accepted by one POST /vote/batch
+    VOTE_BATCH_MAX_ITEMS: int = 500
+    # write-behind POST /vote/: answer 202 right away and let apps/vote_queue.py
+    # write the votes in batches, flushed at VOTE_FLUSH_SIZE distinct
+    # (user, post) pairs or VOTE_FLUSH_INTERVAL seconds after the first one.
+    # Votes are lost if the process dies before a flush, and a vote on a
+    # missing post is dropped silently.
+    VOTE_WRITE_BEHIND: bool = False
+    VOTE_QUEUE_SIZE: int = 100_000
+    VOTE_FLUSH_SIZE: int = 1000
+    VOTE_FLUSH_INTERVAL: float = 0.05
+
+    # POST /posts/bulk: rows per COPY/transaction, and how many invalid items
+    # are reported per chunk (the rest are only counted)
+    POSTS_BULK_CHUNK_SIZE: int = 5000
+    POSTS_BULK_MAX_ERRORS: int = 100
+    # rows fetched per round trip from the server-side cursor of /posts/export
+    POSTS_EXPORT_BATCH_SIZE: int = 1000
+
+    # GET /posts/trending reads the post_scores table, rescored every
+    # TRENDING_REFRESH_INTERVAL seconds (0 turns the in-app job off, e.g. when
+    # cron runs `python -m apps.manage refresh-trending` instead). "exponential"
+    # scores log2(1 + votes) + created_at / half-life, which never changes while
+    # the votes don't, so only posts with new votes are rescored. "gravity"
+    # scores votes / (age in hours + 2) ^ gravity and rescores the whole window.
+    # Run refresh-trending --full after changing the decay settings.
+    TRENDING_DECAY: Literal["exponential", "gravity"] = "exponential"
+    TRENDING_HALF_LIFE_HOURS: float = 12
+    TRENDING_GRAVITY: float = 1.8
+    # posts older than this drop out of the feed
+    TRENDING_WINDOW_DAYS: int = 7
+    TRENDING_REFRESH_INTERVAL: float = 60
+
+    # token buckets per user id (bearer token) or client IP, written as
+    # "<burst>/<seconds to refill it>", an empty value turns that rule off.
+    # "memory" limits each worker separately, use "redis" to share the buckets
+    # between workers (needs the optional redis package).
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    # buckets kept by the memory backend, least recently used are dropped
+    RATE_LIMIT_SIZE: int = 100_000
+    RATE_LIMIT_LOGIN: str = "10/60"
+    RATE_LIMIT_READ: str = "300/60"
+    RATE_LIMIT_WRITE: str = "60/60"
+
+    # per-request SQL profiling, see apps/profiling.py. Adds a Server-Timing
+    # header listing the request's statements, so keep it off where clients
+    # shouldn't see the SQL. Statements slower than SQL_SLOW_QUERY_MS are
+    # logged, SELECTs with their EXPLAIN (ANALYZE, BUFFERS) plan.
+    SQL_PROFILING: bool = False
+    SQL_SLOW_QUERY_MS: float = 100
+    SQL_PROFILING_EXPLAIN: bool = True
+    # statements listed individually in Server-Timing
+    SQL_PROFILING_HEADER_MAX: int = 20
+
+    # posts partitions, see apps/partitions.py: months created ahead of time
+    # (at startup and by `python -m apps.manage create-partitions`), and the age
+    # in months after which `archive-partitions` detaches a month into
+    # gzipped CSV files under POSTS_ARCHIVE_DIR
+    POSTS_PARTITION_MONTHS_AHEAD: int = 3
+    POSTS_ARCHIVE_AFTER_MONTHS: int = 12
+    POSTS_ARCHIVE_DIR: str = "archive"
+
+    # logging, see apps/logs.py. Records below WARNING are sampled per request
+    # at LOG_SAMPLE_RATE (1 keeps everything). Records beyond LOG_QUEUE_SIZE
+    # waiting to be written are dropped rather than blocking the request.
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_SAMPLE_RATE: float = 1.0
+    LOG_QUEUE_SIZE: int = 10_000
+
+    # `python -m apps.server`, see apps/server.py. 0 workers starts one per
+    # available core. Idle keep-alive connections close after SERVER_KEEP_ALIVE
+    # seconds, keep it above the load balancer's idle timeout. Workers get
+    # SERVER_GRACEFUL_TIMEOUT seconds to finish requests on shutdown or reload,
+    # and are replaced after SERVER_MAX_REQUESTS requests (0 never).
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEP_ALIVE: int = 5
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_MAX_REQUESTS: int = 0
 
     class Config:
         env_file = ".env"
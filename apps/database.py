@@ -1,6 +1,12 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from . import profiling
 from .config import settings
+from .metrics import instrument_engine, timed_pool
+from .replicas import Replica, ReplicaSet, RoutingSession
 
 
 class Base(DeclarativeBase):
@@ -9,10 +15,111 @@ class Base(DeclarativeBase):
 
 # 'postgresql://<username>:<password>@<ip-address/hostname>/<database name>'
 SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.DATABASE_USERNAME}:{settings.DATABASE_PASSWORD}@{settings.DATABASE_HOSTNAME}:{settings.DATABASE_PORT}/{settings.DATABASE_NAME}"
+# same database through psycopg 3's native asyncio support
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+psycopg://{settings.DATABASE_USERNAME}:{settings.DATABASE_PASSWORD}@{settings.DATABASE_HOSTNAME}:{settings.DATABASE_PORT}/{settings.DATABASE_NAME}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+pool_options = {
+    "pool_size": settings.DATABASE_POOL_SIZE,
+    "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+    "pool_timeout": settings.DATABASE_POOL_TIMEOUT,
+    "pool_recycle": settings.DATABASE_POOL_RECYCLE,
+    "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+}
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=timed_pool(QueuePool, "sync"),
+    **pool_options,
+)
 SessionLocal = sessionmaker(engine, autocommit=False, autoflush=False)
 
+# psycopg 3 prepares statements after 5 runs, which breaks behind PgBouncer
+# transaction pooling. psycopg2 on the sync engine never prepares.
+async_connect_args = {"prepare_threshold": None} if settings.DATABASE_PGBOUNCER else {}
+
+# engines connect lazily, so this costs nothing while DATABASE_ASYNC is off
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=timed_pool(AsyncAdaptedQueuePool, "async"),
+    connect_args=async_connect_args,
+    **pool_options,
+)
+# no expiry on commit: an expired attribute would need an implicit lazy load,
+# which async sessions can't do
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+if settings.SQL_PROFILING:
+    profiling.instrument_engine(engine)
+    profiling.instrument_engine(async_engine.sync_engine)
+
+
+def replica(n: int, url: str) -> Replica:
+    # a sync and an async engine per replica like the primary, same pool sizes
+    name = f"replica{n}"
+    timeout = settings.DATABASE_REPLICA_CONNECT_TIMEOUT
+    sync = create_engine(
+        make_url(url).set(drivername="postgresql"),
+        poolclass=timed_pool(QueuePool, name),
+        connect_args={"connect_timeout": timeout},
+        **pool_options,
+    )
+    aio = create_async_engine(
+        make_url(url).set(drivername="postgresql+psycopg"),
+        poolclass=timed_pool(AsyncAdaptedQueuePool, f"{name}_async"),
+        connect_args={**async_connect_args, "connect_timeout": timeout},
+        **pool_options,
+    )
+    instrument_engine(sync, name)
+    instrument_engine(aio.sync_engine, f"{name}_async")
+    if settings.SQL_PROFILING:
+        profiling.instrument_engine(sync)
+        profiling.instrument_engine(aio.sync_engine)
+    return Replica(name, sync, aio)
+
+
+replicas = (
+    ReplicaSet(
+        [replica(n, url) for n, url in enumerate(settings.DATABASE_REPLICA_URLS)],
+        settings.DATABASE_REPLICA_BALANCE,
+    )
+    if settings.DATABASE_REPLICA_URLS
+    else None
+)
+# for the read-only routes, without replicas these behave like SessionLocal
+ReadSessionLocal = sessionmaker(
+    engine,
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    replicas=replicas,
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_engine,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    replicas=replicas,
+    use_async=True,
+)
+
+
+def dispose_pools():
+    # a forked child must not reuse the parent's sockets. close=False leaves
+    # them open for the parent, the child starts with empty pools.
+    engines = [engine, async_engine.sync_engine]
+    for replica in replicas.replicas if replicas else []:
+        engines += [replica.engine, replica.async_engine.sync_engine]
+    for pooled in engines:
+        pooled.dispose(close=False)
+
+
+# apps.server spawns fresh workers, this covers servers that fork after import
+os.register_at_fork(after_in_child=dispose_pools)
+
 
 def get_db():
     db = SessionLocal()
@@ -20,3 +127,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
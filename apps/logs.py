@@ -0,0 +1,208 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import re
+import time
+import uuid
+import zlib
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import orjson
+from .config import settings
+from .metrics import LOG_RECORDS_DROPPED
+
+# Structured logging. Handlers only put records on a bounded queue, a listener
+# thread formats and writes them, so a slow stdout never stalls a request and a
+# full queue drops records instead of blocking. Records carry the request id
+# set by RequestLogMiddleware, and secrets are redacted on the way out.
+
+request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+logger = logging.getLogger("apps.access")
+
+# attributes every LogRecord has, anything else came in through extra=
+RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "request_id"}
+
+SECRET_KEYS = re.compile(r"pass(word)?|secret|token|authorization|cookie|hash", re.I)
+SECRET_VALUES = [
+    # bearer credentials and anything shaped like a JWT
+    (re.compile(r"(?i)\b(bearer\s+)[\w.~+/-]+=*"), r"\1[REDACTED]"),
+    (re.compile(r"\beyJ[\w-]*\.[\w-]+\.[\w-]*"), "[REDACTED]"),
+    # bcrypt hashes
+    (re.compile(r"\$2[aby]?\$\d\d\$[./\w]{53}"), "[REDACTED]"),
+]
+
+
+def redact(value):
+    if isinstance(value, str):
+        for pattern, replacement in SECRET_VALUES:
+            value = pattern.sub(replacement, value)
+        return value
+    if isinstance(value, dict):
+        return {
+            k: "[REDACTED]" if SECRET_KEYS.search(str(k)) else redact(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(v) for v in value]
+    return value
+
+
+class ContextFilter(logging.Filter):
+    # runs on the request's thread/task, before the record leaves its context
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    # keeps LOG_SAMPLE_RATE of the records below WARNING. Decided per request
+    # id, so a sampled request keeps all of its records.
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = rate * 2**32
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.threshold >= 2**32:
+            return True
+        key = record.request_id or f"{record.name}{record.created}"
+        return zlib.crc32(key.encode()) < self.threshold
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+    def prepare(self, record):
+        # resolve the message and traceback now, the listener sees plain data
+        record = logging.makeLogRecord(vars(record))
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage()),
+            "request_id": getattr(record, "request_id", None),
+        }
+        extra = {k: v for k, v in vars(record).items() if k not in RECORD_ATTRS}
+        if extra:
+            entry.update(redact(extra))
+        if record.exc_text:
+            entry["exception"] = redact(record.exc_text)
+        return orjson.dumps(entry, default=str, option=orjson.OPT_UTC_Z).decode()
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__(
+            "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+        )
+
+    def format(self, record):
+        record.request_id = getattr(record, "request_id", None)
+        return redact(super().format(record))
+
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def configure_logging():
+    global _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler()
+    output.setFormatter(
+        JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter()
+    )
+    handler = DroppingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+    # uvicorn's own loggers go through the same pipeline
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers.clear()
+        logging.getLogger(name).propagate = True
+
+    _listener = logging.handlers.QueueListener(
+        handler.queue, output, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    # flushes whatever is still queued
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def incoming_request_id(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            # accept the caller's id if it's sane, it ends up in every record
+            value = value.decode("latin-1")
+            if 0 < len(value) <= 128 and value.isprintable():
+                return value
+            break
+    return uuid.uuid4().hex
+
+
+class RequestLogMiddleware:
+    # assigns the request id, echoes it back as X-Request-ID and writes one
+    # access record per request (sampled like any other INFO record). Run
+    # uvicorn with --no-access-log so requests aren't logged twice.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rid = incoming_request_id(scope)
+        token = request_id.set(rid)
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"x-request-id", rid.encode("latin-1")),
+                ]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            logger.info(
+                "%s %s %s",
+                scope["method"],
+                scope["path"],
+                status,
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                    "client": (scope.get("client") or ("",))[0],
+                },
+            )
+            request_id.reset(token)
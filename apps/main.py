@@ -1,13 +1,56 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from . import models
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from . import database, logs, models, partitions, ratelimit, trending, utils
+from .config import settings
 from .database import engine, get_db
-from .routers import post, user, auth, vote
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .vote_queue import vote_queue
+
+# async routers run on the AsyncEngine, switch per deployment while migrating
+if settings.DATABASE_ASYNC:
+    from .routers.aio import post, user, auth, vote
+else:
+    from .routers import post, user, auth, vote
+from .routers import bulk
 
 # models.Base.metadata.create_all(engine)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logs.configure_logging()
+    await asyncio.to_thread(partitions.ensure_partitions)
+    refresher = None
+    if settings.TRENDING_REFRESH_INTERVAL > 0:
+        refresher = asyncio.create_task(trending.refresher())
+    if settings.VOTE_WRITE_BEHIND:
+        vote_queue.start()
+    checker = None
+    if database.replicas:
+        checker = asyncio.create_task(
+            database.replicas.checker(
+                settings.DATABASE_REPLICA_CHECK_INTERVAL,
+                settings.DATABASE_REPLICA_MAX_LAG,
+            )
+        )
+    yield
+    if refresher:
+        refresher.cancel()
+    if checker:
+        checker.cancel()
+    # drains the queued votes before the process exits
+    await vote_queue.stop()
+    utils.shutdown_executor()
+    logs.shutdown_logging()
+
+
+# orjson for every JSON response, pydantic still validates where response_model is set
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 origins = [
     "*",
@@ -17,6 +60,10 @@ origins = [
     "http://localhost:8080",
 ]
 
+# added first so CORS wraps it and 429s still carry the CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(ratelimit.RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -25,8 +72,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.SQL_PROFILING:
+    app.add_middleware(ProfilingMiddleware)
+
+# latency covers the middleware added above, but not RequestLogMiddleware
+# below, which wraps this one
+app.add_middleware(MetricsMiddleware)
+# outermost, the request id comes first so every record of the request carries it
+app.add_middleware(logs.RequestLogMiddleware)
+
 
 # add routes from post and user to main
+# bulk first, its /posts/<name> paths would otherwise match /posts/{id}
+app.include_router(bulk.router)
 app.include_router(post.router)
 app.include_router(user.router)
 app.include_router(auth.router)
@@ -36,3 +94,8 @@ app.include_router(vote.router)
 @app.get("/")
 async def root():
     return {"Message": "Hello World"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,106 @@
+import argparse
+from sqlalchemy import text
+from . import partitions, trending
+from .config import settings
+from .database import SessionLocal, engine
+
+# Maintenance commands, run from the project root:
+#   python -m apps.manage reconcile-votes [--dry-run]
+#   python -m apps.manage refresh-trending [--full]
+#   python -m apps.manage create-partitions [--months-ahead N]
+#   python -m apps.manage archive-partitions [--older-than-months N] [--dir DIR] [--dry-run]
+
+
+def reconcile_votes(dry_run: bool = False) -> int:
+    # recount votes per post and repair any posts.vote_count that drifted
+    drifted = text(
+        """
+        SELECT posts.id, posts.vote_count, coalesce(counts.n, 0) AS actual
+        FROM posts
+        LEFT JOIN (SELECT post_id, count(*) AS n FROM votes GROUP BY post_id) AS counts
+            ON counts.post_id = posts.id
+        WHERE posts.vote_count <> coalesce(counts.n, 0)
+        """
+    )
+    repair = text(
+        """
+        UPDATE posts
+        SET vote_count = (SELECT count(*) FROM votes WHERE votes.post_id = posts.id)
+        WHERE posts.id = :id
+        """
+    )
+    with SessionLocal() as db:
+        rows = db.execute(drifted).all()
+        for row in rows:
+            print(f"post {row.id}: vote_count {row.vote_count} -> {row.actual}")
+            if not dry_run:
+                # recount under the row lock so votes landing meanwhile aren't lost
+                db.execute(repair, {"id": row.id})
+        if not dry_run:
+            db.commit()
+    return len(rows)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m apps.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = commands.add_parser(
+        "reconcile-votes", help="repair posts.vote_count drift against votes"
+    )
+    reconcile.add_argument("--dry-run", action="store_true")
+
+    refresh = commands.add_parser(
+        "refresh-trending", help="rescore posts in the GET /posts/trending window"
+    )
+    refresh.add_argument(
+        "--full", action="store_true", help="rescore every post, not just changed ones"
+    )
+
+    create = commands.add_parser(
+        "create-partitions", help="create the upcoming monthly posts partitions"
+    )
+    create.add_argument(
+        "--months-ahead", type=int, default=settings.POSTS_PARTITION_MONTHS_AHEAD
+    )
+
+    archive = commands.add_parser(
+        "archive-partitions",
+        help="export cold posts partitions to gzipped CSV, then detach and drop them",
+    )
+    archive.add_argument(
+        "--older-than-months", type=int, default=settings.POSTS_ARCHIVE_AFTER_MONTHS
+    )
+    archive.add_argument("--dir", default=settings.POSTS_ARCHIVE_DIR)
+    archive.add_argument("--dry-run", action="store_true")
+
+    args = parser.parse_args(argv)
+    if args.command == "reconcile-votes":
+        fixed = reconcile_votes(dry_run=args.dry_run)
+        print(f"{fixed} post(s) {'drifted' if args.dry_run else 'repaired'}")
+    elif args.command == "refresh-trending":
+        rescored = trending.refresh_now(full=args.full)
+        if rescored is None:
+            print("another refresh is running, try again later")
+        else:
+            print(f"{rescored} post(s) rescored")
+    elif args.command == "create-partitions":
+        with engine.begin() as conn:
+            created = partitions.create_partitions(conn, args.months_ahead)
+        print(f"created {', '.join(created) or 'nothing'}")
+    elif args.command == "archive-partitions":
+        with engine.connect() as conn:
+            cold = partitions.cold_partitions(conn, args.older_than_months)
+        for name in cold:
+            if args.dry_run:
+                print(f"would archive {name}")
+                continue
+            for path in partitions.archive_partition(name, args.dir):
+                print(f"wrote {path}")
+            print(f"archived {name}")
+        if not cold:
+            print("nothing to archive")
+
+
+if __name__ == "__main__":
+    main()
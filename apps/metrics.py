@@ -0,0 +1,257 @@
+import time
+from contextvars import ContextVar
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+# Prometheus metrics, served by GET /metrics in main.py. Labels stay low
+# cardinality (engine = sync/async, route templates rather than raw paths) so
+# scraping stays cheap.
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "Requests served", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to the end of the response body",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+# the route is only known once the router ran, so in-flight is per method
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served", ["method"])
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed per request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+HTTP_DB_TIME = Histogram(
+    "http_request_db_seconds",
+    "Time spent executing SQL per request",
+    ["route"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed", ["engine"])
+DB_QUERY_TIME = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time",
+    ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+
+PASSWORD_HASH_TIME = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash/verify in the process pool, including time queued",
+    ["op"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Hash jobs refused with a 503, pool full"
+)
+
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DATABASE_POOL_TIMEOUT",
+    ["engine"],
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out", "Connections currently checked out", ["engine"]
+)
+POOL_SATURATION = Gauge(
+    "db_pool_saturation",
+    "Checked out connections over pool size plus overflow",
+    ["engine"],
+)
+POOL_CONNECTIONS_OPENED = Counter(
+    "db_pool_connections_opened_total", "New DBAPI connections", ["engine"]
+)
+POOL_CONNECTIONS_CLOSED = Counter(
+    "db_pool_connections_closed_total",
+    "DBAPI connections closed, recycled or invalidated",
+    ["engine"],
+)
+
+JWT_CACHE_REQUESTS = Counter(
+    "jwt_cache_requests_total", "Decoded-token cache lookups", ["result"]
+)
+JWT_CACHE_HITS = JWT_CACHE_REQUESTS.labels("hit")
+JWT_CACHE_MISSES = JWT_CACHE_REQUESTS.labels("miss")
+
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total", "Log records dropped because the queue was full"
+)
+
+VOTE_QUEUE_DEPTH = Gauge("vote_queue_depth", "Votes waiting for the write-behind flush")
+VOTE_FLUSH_ITEMS = Histogram(
+    "vote_flush_items",
+    "Votes per write-behind flush, before and after coalescing",
+    ["stage"],
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+VOTES_DROPPED = Counter(
+    "votes_dropped_total", "Write-behind votes lost after the flush kept failing"
+)
+
+RATE_LIMITED = Counter(
+    "rate_limited_requests_total", "Requests rejected with a 429", ["rule"]
+)
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+# set per request by MetricsMiddleware; the threadpool and SQLAlchemy's async
+# greenlets copy the context, so engine events see the same object
+request_queries: ContextVar[QueryStats | None] = ContextVar(
+    "request_queries", default=None
+)
+
+
+def timed_pool(pool_class: type[Pool], label: str) -> type[Pool]:
+    # there's no "before checkout" pool event, so time the blocking get directly
+    class TimedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                POOL_CHECKOUT_TIMEOUTS.labels(label).inc()
+                raise
+            finally:
+                POOL_CHECKOUT_WAIT.labels(label).observe(time.perf_counter() - start)
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+def instrument_engine(engine: Engine, label: str):
+    # gauges are computed at scrape time, read engine.pool each time since
+    # dispose() swaps the pool object
+    def checked_out():
+        return engine.pool.checkedout()
+
+    def saturation():
+        pool = engine.pool
+        # max_overflow -1 means unbounded, measure against the base size then.
+        # pool_size 0 with unbounded overflow has no limit to saturate.
+        limit = pool.size() + max(pool._max_overflow, 0)
+        return pool.checkedout() / limit if limit else 0
+
+    POOL_CHECKED_OUT.labels(label).set_function(checked_out)
+    POOL_SATURATION.labels(label).set_function(saturation)
+
+    event.listen(
+        engine, "connect", lambda *_: POOL_CONNECTIONS_OPENED.labels(label).inc()
+    )
+    event.listen(
+        engine, "close", lambda *_: POOL_CONNECTIONS_CLOSED.labels(label).inc()
+    )
+    event.listen(
+        engine, "close_detached", lambda *_: POOL_CONNECTIONS_CLOSED.labels(label).inc()
+    )
+
+    queries, query_time = DB_QUERIES.labels(label), DB_QUERY_TIME.labels(label)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        queries.inc()
+        query_time.observe(elapsed)
+        stats = request_queries.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+class MetricsMiddleware:
+    # plain ASGI rather than BaseHTTPMiddleware, which costs a task per request.
+    # labels() takes a lock and builds a key on every call, so the children are
+    # looked up once per label set and kept in plain dicts.
+    def __init__(self, app):
+        self.app = app
+        self._in_flight = {}
+        self._requests = {}
+        self._observers = {}
+
+    def observers(self, method: str, route: str):
+        key = (method, route)
+        children = self._observers.get(key)
+        if children is None:
+            children = self._observers[key] = (
+                HTTP_LATENCY.labels(method, route),
+                HTTP_DB_QUERIES.labels(route),
+                HTTP_DB_TIME.labels(route),
+            )
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        status = 500
+        stats = QueryStats()
+        token = request_queries.set(stats)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = self._in_flight.get(method)
+        if in_flight is None:
+            in_flight = self._in_flight[method] = HTTP_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            request_queries.reset(token)
+            # the router leaves the matched route in the scope, unmatched paths
+            # share one label so scanners can't blow up the series count
+            route = getattr(scope.get("route"), "path", "unmatched")
+            key = (method, route, status)
+            requests = self._requests.get(key)
+            if requests is None:
+                requests = self._requests[key] = HTTP_REQUESTS.labels(*key)
+            requests.inc()
+            latency, db_queries, db_time = self.observers(method, route)
+            latency.observe(elapsed)
+            db_queries.observe(stats.count)
+            db_time.observe(stats.seconds)
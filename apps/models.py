@@ -1,14 +1,38 @@
 from datetime import datetime
 from .database import Base
-from sqlalchemy import ForeignKey, MetaData, TIMESTAMP, String, func
+from sqlalchemy import (
+    Computed,
+    Double,
+    ForeignKey,
+    Index,
+    MetaData,
+    TIMESTAMP,
+    String,
+    func,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.sql.expression import text
 
 metadata_obj = MetaData()
 
+# title outranks content in GET /posts?search=
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
 
 class Post(Base):
     __tablename__ = "posts"
+    # range partitioned by month of created_at since migration b76103d26d88, the
+    # table's primary key is (id, created_at). ids stay the ORM identity and are
+    # kept unique by post_ids. Lookups by id alone probe ix_posts_id in every
+    # partition. id and created_at can't be updated.
+    __table_args__ = (
+        Index("ix_posts_id", "id"),
+        # keyset pagination order of GET /posts
+        Index("ix_posts_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(nullable=False, primary_key=True)
     title: Mapped[str] = mapped_column(nullable=False)
@@ -18,12 +42,23 @@ class Post(Base):
         TIMESTAMP(timezone=True), server_default=func.now()
     )
     owner_id: Mapped[int] = mapped_column(
-        ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    # denormalized count of rows in votes, kept in step by the vote router
+    # and repairable with `python -m apps.manage reconcile-votes`
+    vote_count: Mapped[int] = mapped_column(nullable=False, server_default="0")
+    # maintained by postgres, deferred so loading a Post doesn't drag it along
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR, Computed(SEARCH_VECTOR, persisted=True), deferred=True
     )
 
     owner = relationship("User")
 
 
+# keyset pagination order of GET /posts
+Index("ix_posts_created_at_id", Post.created_at.desc(), Post.id.desc())
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -35,12 +70,41 @@ class User(Base):
     )
 
 
+class PostId(Base):
+    # one row per post, maintained by the posts_track_id trigger. A partitioned
+    # posts can't be the target of a foreign key, votes and post_scores
+    # reference this instead and go away with the post.
+    __tablename__ = "post_ids"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+
+
 class Vote(Base):
     __tablename__ = "votes"
+    # hash partitioned by post_id
 
     user_id: Mapped[int] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
     )
+    # the primary key leads with user_id, so lookups by post need their own index
     post_id: Mapped[int] = mapped_column(
-        ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True
+        ForeignKey("post_ids.id", ondelete="CASCADE"), primary_key=True, index=True
     )
+
+
+class PostScore(Base):
+    __tablename__ = "post_scores"
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey("post_ids.id", ondelete="CASCADE"), primary_key=True
+    )
+    score: Mapped[float] = mapped_column(Double, nullable=False)
+    # posts.vote_count the score was computed from, a mismatch means the post
+    # has to be rescored
+    vote_count: Mapped[int] = mapped_column(nullable=False)
+    refreshed_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+# keyset pagination order of GET /posts/trending
+Index("ix_post_scores_score_post_id", PostScore.score.desc(), PostScore.post_id.desc())
@@ -1,12 +1,18 @@
 from datetime import datetime, timedelta, timezone
+import hashlib
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 from jwt.exceptions import InvalidTokenError
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import Annotated
 from . import schemas, models, config
-from .database import get_db
+from .cache import MISSING, TTLCache
+from .database import get_async_db, get_db
+from .metrics import JWT_CACHE_HITS, JWT_CACHE_MISSES
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
@@ -15,6 +21,19 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 SECRET_KEY = config.settings.SECRET_KEY
 ALGORITHM = config.settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = config.settings.ACCESS_TOKEN_EXPIRATION_MINUTES
+AUTH_MODE = config.settings.AUTH_MODE
+
+# stateless mode: users loaded for tokens without claims, and tombstones for
+# deleted users so their still-valid tokens stop working in this process
+user_cache = TTLCache(
+    config.settings.AUTH_USER_CACHE_SIZE, config.settings.AUTH_USER_CACHE_TTL
+)
+DELETED = object()
+
+# decoded claims by token hash, so a reused token skips jwt.decode. Entries
+# live until the token's own exp and the hit path re-checks it, so an expired
+# token is never accepted from the cache.
+token_cache = TTLCache(config.settings.JWT_CACHE_SIZE, 0)
 
 
 def create_access_token(data: dict):
@@ -29,26 +48,84 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-def verify_access_token(token: str) -> schemas.TokenData:
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Please Login Again",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def verify_access_token(token: str) -> schemas.TokenData:
+    if token_cache.maxsize:
+        key = hashlib.sha256(token.encode()).digest()
+        cached = token_cache.get(key)
+        if cached is not MISSING and cached[1] > time.time():
+            JWT_CACHE_HITS.inc()
+            return cached[0]
+        JWT_CACHE_MISSES.inc()
     try:
         payload = jwt.decode(token, SECRET_KEY, [ALGORITHM])
-        print(payload)
         user_id = payload.get("user_id")
-        if id is None:
-            raise credentials_exception
+        if user_id is None:
+            raise credentials_exception()
 
         # Validation using pydantic schemas
-        token_data = schemas.TokenData(id=str(user_id))
+        token_data = schemas.TokenData(id=str(user_id), email=payload.get("email"))
     except InvalidTokenError:
-        raise credentials_exception
+        raise credentials_exception()
+    # PyJWT already rejected a past exp, tokens without one aren't cached
+    expires = payload.get("exp")
+    if token_cache.maxsize and expires is not None:
+        token_cache.set(key, (token_data, expires), ttl=expires - time.time())
     return token_data
 
 
+def invalidate_user(user_id: int):
+    # outlive any token issued before the delete
+    user_cache.set(user_id, DELETED, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_deleted_users(session, flush_context):
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, models.User)]
+    if deleted:
+        session.info.setdefault("deleted_users", []).extend(deleted)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_deleted_users(session):
+    for user_id in session.info.pop("deleted_users", ()):
+        invalidate_user(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_deleted_users(session):
+    session.info.pop("deleted_users", None)
+
+
+def _stateless_user(token_data: schemas.TokenData) -> schemas.CurrentUser | None:
+    # None means the caller has to load the row from the database
+    user_id = int(token_data.id)
+    cached = user_cache.get(user_id)
+    if cached is DELETED:
+        raise credentials_exception()
+    if cached is not MISSING:
+        return cached
+    if token_data.email:
+        # signed claims we issued, skip the (slow) email validation
+        return schemas.CurrentUser.model_construct(id=user_id, email=token_data.email)
+    return None
+
+
+def _cache_user(user: models.User | None) -> schemas.CurrentUser:
+    if user is None:
+        raise credentials_exception()
+    current = schemas.CurrentUser(id=user.id, email=user.email)
+    user_cache.set(user.id, current)
+    return current
+
+
 def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     db: Annotated[Session, Depends(get_db)],
@@ -56,6 +133,37 @@ def get_current_user(
 
     token_data = verify_access_token(token)
 
+    if AUTH_MODE == "stateless":
+        # sessions connect lazily, a claims hit never touches the pool
+        user = _stateless_user(token_data)
+        if user is None:
+            user = _cache_user(db.get(models.User, int(token_data.id)))
+        return user
+
     user = db.query(models.User).filter(models.User.id == token_data.id).first()
+    if user is None:
+        raise credentials_exception()
+
+    return user
+
+
+async def get_current_user_async(
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+):
+
+    token_data = verify_access_token(token)
+
+    if AUTH_MODE == "stateless":
+        user = _stateless_user(token_data)
+        if user is None:
+            user = _cache_user(await db.get(models.User, int(token_data.id)))
+        return user
+
+    user = await db.scalar(
+        select(models.User).where(models.User.id == int(token_data.id))
+    )
+    if user is None:
+        raise credentials_exception()
 
     return user
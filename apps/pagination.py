@@ -0,0 +1,55 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from fastapi import HTTPException, status
+
+# Cursors are opaque to clients: a urlsafe base64 of the sort key of the last row
+# on the page. Keyset pagination on (created_at, id) means every page is an index
+# range scan, so page N costs the same as page 1.
+
+
+def _encode(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(cursor: str) -> dict:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded))
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    return _encode({"c": created_at.isoformat(), "i": id})
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        data = _decode(cursor)
+        return datetime.fromisoformat(data["c"]), int(data["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+# search results are ordered by relevance, so their cursors carry the rank
+def encode_rank_cursor(rank: float, id: int) -> str:
+    return _encode({"r": rank, "i": id})
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    try:
+        data = _decode(cursor)
+        return float(data["r"]), int(data["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+
+def clamp_limit(limit: int | None, default: int, maximum: int) -> int:
+    # server enforced page size, clients can ask for less but never more
+    if limit is None:
+        return default
+    return max(1, min(limit, maximum))
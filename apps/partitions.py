@@ -0,0 +1,149 @@
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from sqlalchemy import Connection, text
+from .config import settings
+from .database import engine
+
+# Monthly range partitions of posts (migration b76103d26d88). There is no
+# default partition, a post whose month has no partition fails to insert, so
+# months are created POSTS_PARTITION_MONTHS_AHEAD ahead: at startup and from
+# cron via `python -m apps.manage create-partitions`.
+#
+# Archiving detaches a cold month, writes it and the votes on its posts to
+# gzipped CSV and drops it, in one transaction. votes is hash partitioned by
+# post_id, so it never has cold partitions of its own; the month's votes and
+# scores are deleted through post_ids instead.
+
+logger = logging.getLogger(__name__)
+
+NAME = re.compile(r"^posts_p(\d{4})(\d{2})$")
+POST_COLUMNS = "id, title, content, published, created_at, owner_id, vote_count"
+
+
+def add_months(month: date, n: int) -> date:
+    years, index = divmod(month.month - 1 + n, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def this_month() -> date:
+    return datetime.now(timezone.utc).date().replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"posts_p{month:%Y%m}"
+
+
+def post_partitions(conn: Connection) -> dict[date, str]:
+    rows = conn.execute(
+        text(
+            """
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = 'posts'::regclass
+            """
+        )
+    ).scalars()
+    months = {}
+    for name in rows:
+        match = NAME.match(name)
+        if match:
+            months[date(int(match[1]), int(match[2]), 1)] = name
+    return dict(sorted(months.items()))
+
+
+def create_partitions(
+    conn: Connection, months_ahead: int, since: date | None = None
+) -> list[str]:
+    # this month and months_ahead more, or every month from since on when
+    # loading older posts
+    existing = post_partitions(conn)
+    created = []
+    month = since or this_month()
+    last = add_months(this_month(), months_ahead)
+    while month <= last:
+        if month not in existing:
+            name = partition_name(month)
+            conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF posts"
+                    f" FOR VALUES FROM ('{month} 00:00+00')"
+                    f" TO ('{add_months(month, 1)} 00:00+00')"
+                )
+            )
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def ensure_partitions() -> list[str]:
+    # startup hook, a failure is logged rather than keeping the app down
+    try:
+        with engine.begin() as conn:
+            return create_partitions(conn, settings.POSTS_PARTITION_MONTHS_AHEAD)
+    except Exception:
+        logger.exception("creating posts partitions failed")
+        return []
+
+
+def cold_partitions(conn: Connection, older_than_months: int) -> list[str]:
+    # months that ended at least older_than_months ago
+    cutoff = add_months(this_month(), -older_than_months)
+    return [
+        name
+        for month, name in post_partitions(conn).items()
+        if add_months(month, 1) <= cutoff
+    ]
+
+
+def copy_to_file(cursor, query: str, path: str):
+    # fsynced before the rows are dropped from the database
+    with open(path, "wb") as raw:
+        with gzip.open(raw, "wt", encoding="utf-8") as out:
+            cursor.copy_expert(
+                f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", out
+            )
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_partition(name: str, directory: str) -> list[str]:
+    # one transaction, through psycopg2's COPY (the sync engine's driver). The
+    # detach locks posts until the commit, so reads and writes of every post
+    # wait for the export: run it off-peak, a month at a time. Votes can't sneak
+    # in meanwhile, the month's post_ids rows are locked before the export.
+    os.makedirs(directory, exist_ok=True)
+    posts_path = os.path.join(directory, f"{name}.csv.gz")
+    votes_path = os.path.join(directory, f"{name}_votes.csv.gz")
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            # give up rather than queue every posts query behind a long reader
+            cursor.execute("SET LOCAL lock_timeout = '5s'")
+            cursor.execute(f"ALTER TABLE posts DETACH PARTITION {name}")
+            cursor.execute("SET LOCAL lock_timeout = DEFAULT")
+            cursor.execute(
+                f"SELECT count(*) FROM (SELECT FROM post_ids JOIN {name} USING (id)"
+                " FOR UPDATE OF post_ids) AS locked"
+            )
+            copy_to_file(cursor, f"SELECT {POST_COLUMNS} FROM {name}", posts_path)
+            copy_to_file(
+                cursor,
+                f"SELECT votes.user_id, votes.post_id FROM votes"
+                f" JOIN {name} ON {name}.id = votes.post_id",
+                votes_path,
+            )
+            # cascades to votes and post_scores
+            cursor.execute(
+                f"DELETE FROM post_ids USING {name} WHERE post_ids.id = {name}.id"
+            )
+            cursor.execute(f"DROP TABLE {name}")
+        raw.commit()
+    except BaseException:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    return [posts_path, votes_path]
@@ -0,0 +1,123 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import NamedTuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from .config import settings
+
+# Opt-in SQL profiling (SQL_PROFILING). Every statement a request runs is kept
+# with its timing, summarized in a Server-Timing header on the response, and
+# statements slower than SQL_SLOW_QUERY_MS are logged with their plan. Plans
+# come from EXPLAIN (ANALYZE, BUFFERS), which runs the statement a second time,
+# so only plain SELECTs are explained.
+
+logger = logging.getLogger(__name__)
+
+
+class Statement(NamedTuple):
+    sql: str
+    seconds: float
+
+
+# set per request by ProfilingMiddleware, copied into the threadpool and
+# SQLAlchemy's async greenlets along with the rest of the context
+request_statements: ContextVar[list[Statement] | None] = ContextVar(
+    "request_statements", default=None
+)
+
+
+def explain(conn, statement: str, parameters) -> str:
+    # a fresh cursor, the original one still holds the rows being fetched
+    cursor = conn.connection.cursor()
+    try:
+        # inside a savepoint, a failed EXPLAIN would otherwise abort the
+        # request's transaction
+        cursor.execute("SAVEPOINT sql_profiling_explain")
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+            return "\n".join(row[0] for row in cursor.fetchall())
+        finally:
+            cursor.execute("ROLLBACK TO SAVEPOINT sql_profiling_explain")
+            cursor.execute("RELEASE SAVEPOINT sql_profiling_explain")
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine: Engine):
+    threshold = settings.SQL_SLOW_QUERY_MS / 1000
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        elapsed = time.perf_counter() - conn.info["profile_start"].pop()
+        statements = request_statements.get()
+        if statements is not None:
+            statements.append(Statement(statement, elapsed))
+        if elapsed < threshold:
+            return
+        plan = None
+        if settings.SQL_PROFILING_EXPLAIN and not many:
+            if statement.lstrip()[:6].upper() == "SELECT":
+                plan = explain(conn, statement, parameters)
+        logger.warning(
+            "slow query %.1fms: %s\n%s",
+            elapsed * 1000,
+            statement,
+            plan or "(no plan)",
+        )
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def server_timing(statements: list[Statement]) -> bytes:
+    # total first, then each statement in execution order, capped so a chatty
+    # request can't produce an oversized header
+    total = sum(s.seconds for s in statements) * 1000
+    entries = [f'db;dur={total:.2f};desc="{len(statements)} queries"']
+    for i, s in enumerate(statements[: settings.SQL_PROFILING_HEADER_MAX], 1):
+        desc = " ".join(s.sql.split())[:60].replace('"', "'").replace("\\", "")
+        entries.append(f'sql-{i};dur={s.seconds * 1000:.2f};desc="{desc}"')
+    return ", ".join(entries).encode("latin-1", "replace")
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        statements = []
+        token = request_statements.set(statements)
+
+        async def send_with_timing(message):
+            # statements run after the headers went out (streamed bodies)
+            # only show up in the debug log below
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"server-timing", server_timing(statements)),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            request_statements.reset(token)
+            if statements:
+                logger.debug(
+                    "%s %s ran %d statements in %.1fms:\n%s",
+                    scope["method"],
+                    scope["path"],
+                    len(statements),
+                    sum(s.seconds for s in statements) * 1000,
+                    "\n".join(
+                        f"  {s.seconds * 1000:8.2f}ms  {' '.join(s.sql.split())}"
+                        for s in statements
+                    ),
+                )
@@ -0,0 +1,228 @@
+from sqlalchemy import (
+    Delete,
+    Double,
+    Insert,
+    Integer,
+    Select,
+    Update,
+    and_,
+    column,
+    delete,
+    func,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert, websearch_to_tsquery
+from sqlalchemy.orm import joinedload
+from . import models, serializers
+from .pagination import (
+    decode_cursor,
+    decode_rank_cursor,
+    encode_cursor,
+    encode_rank_cursor,
+)
+
+# Statements shared by the sync routers (apps/routers) and the async ones
+# (apps/routers/aio) so both execute exactly the same SQL.
+
+
+def post_with_votes() -> Select:
+    # owner is many-to-one and never null, so an inner join loads it with the
+    # row instead of one lazy SELECT per post during serialization
+    return select(models.Post, models.Post.vote_count.label("votes")).options(
+        joinedload(models.Post.owner, innerjoin=True)
+    )
+
+
+def page_columns() -> Select:
+    # plain columns rather than entities: no identity map or ORM objects per row,
+    # apps/serializers.py turns the tuples straight into JSON
+    return select(
+        models.Post.id,
+        models.Post.title,
+        models.Post.content,
+        models.Post.published,
+        models.Post.created_at,
+        models.Post.owner_id,
+        models.Post.vote_count,
+        models.User.email.label("owner_email"),
+        models.User.created_at.label("owner_created_at"),
+    ).join(models.User, models.User.id == models.Post.owner_id)
+
+
+def post_page(
+    limit: int,
+    cursor: str | None = None,
+    search: str | None = None,
+    owner_id: int | None = None,
+) -> Select:
+    query = page_columns()
+    if owner_id is not None:
+        query = query.where(models.Post.owner_id == owner_id)
+    if search:
+        # GIN-indexed match, ranked by relevance instead of recency
+        tsquery = websearch_to_tsquery("english", search)
+        # ts_rank is a float4, compare as float8 so the rank in the cursor
+        # round-trips exactly through JSON
+        rank = func.ts_rank(models.Post.search_vector, tsquery).cast(Double)
+        query = query.add_columns(rank.label("rank")).where(
+            models.Post.search_vector.bool_op("@@")(tsquery)
+        )
+        if cursor:
+            last_rank, last_id = decode_rank_cursor(cursor)
+            query = query.where(
+                tuple_(rank, models.Post.id) < tuple_(last_rank, last_id)
+            )
+        order = (rank.desc(), models.Post.id.desc())
+    else:
+        if cursor:
+            created_at, last_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(models.Post.created_at, models.Post.id)
+                < tuple_(created_at, last_id)
+            )
+        order = (models.Post.created_at.desc(), models.Post.id.desc())
+    # fetch one extra row to know whether another page exists
+    return query.order_by(*order).limit(limit + 1)
+
+
+def trending_page(limit: int, cursor: str | None = None) -> Select:
+    # precomputed by apps/trending.py, walks ix_post_scores_score_post_id
+    scores = models.PostScore
+    query = page_columns().add_columns(scores.score.label("rank"))
+    query = query.join(scores, scores.post_id == models.Post.id)
+    if cursor:
+        last_score, last_id = decode_rank_cursor(cursor)
+        query = query.where(
+            tuple_(scores.score, scores.post_id) < tuple_(last_score, last_id)
+        )
+    return query.order_by(scores.score.desc(), scores.post_id.desc()).limit(limit + 1)
+
+
+def page_response(rows: list, limit: int, ranked: bool = False) -> dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if ranked:
+            next_cursor = encode_rank_cursor(last.rank, last.id)
+        else:
+            next_cursor = encode_cursor(last.created_at, last.id)
+    return {
+        "data": [serializers.post_vote(row) for row in rows],
+        "next_cursor": next_cursor,
+    }
+
+
+def post_by_id(id: int) -> Select:
+    return post_with_votes().where(models.Post.id == id)
+
+
+def post_with_owner(id: int) -> Select:
+    # populate_existing refreshes a post already in the session, e.g. right after
+    # a commit, since async sessions can't lazy load the owner on access
+    return (
+        select(models.Post)
+        .options(joinedload(models.Post.owner, innerjoin=True))
+        .where(models.Post.id == id)
+        .execution_options(populate_existing=True)
+    )
+
+
+def change_vote_count(post_id: int, delta: int) -> Update:
+    # relative update is applied under the row lock, safe against concurrent voters
+    return (
+        update(models.Post)
+        .where(models.Post.id == post_id)
+        .values(vote_count=models.Post.vote_count + delta)
+    )
+
+
+def vote_state(post_id: int, user_id: int) -> Select:
+    # one round trip: no row if the post is missing, voted is None if no vote yet
+    return (
+        select(models.Post.id, models.Vote.user_id.label("voted"))
+        .outerjoin(
+            models.Vote,
+            and_(models.Vote.post_id == models.Post.id, models.Vote.user_id == user_id),
+        )
+        .where(models.Post.id == post_id)
+    )
+
+
+def lock_posts(post_ids) -> Select:
+    # existence check for a vote batch. Locks rows in id order so batches touching
+    # the same posts queue up instead of deadlocking on the vote_count updates.
+    # NO KEY UPDATE still lets other voters' FK checks through.
+    return (
+        select(models.Post.id)
+        .where(models.Post.id.in_(post_ids))
+        .order_by(models.Post.id)
+        .with_for_update(key_share=True)
+    )
+
+
+def insert_votes(user_id: int, post_ids) -> Insert:
+    # returns only the rows actually inserted, existing votes are skipped
+    return (
+        insert(models.Vote)
+        .values([{"user_id": user_id, "post_id": post_id} for post_id in post_ids])
+        .on_conflict_do_nothing()
+        .returning(models.Vote.post_id)
+    )
+
+
+def delete_votes(user_id: int, post_ids) -> Delete:
+    return (
+        delete(models.Vote)
+        .where(models.Vote.user_id == user_id, models.Vote.post_id.in_(post_ids))
+        .returning(models.Vote.post_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def change_vote_counts(post_ids, delta: int) -> Update:
+    return (
+        update(models.Post)
+        .where(models.Post.id.in_(post_ids))
+        .values(vote_count=models.Post.vote_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# multi-user variants for the write-behind flush in apps/vote_queue.py
+
+
+def insert_vote_pairs(pairs) -> Insert:
+    return (
+        insert(models.Vote)
+        .values(
+            [{"user_id": user_id, "post_id": post_id} for user_id, post_id in pairs]
+        )
+        .on_conflict_do_nothing()
+        .returning(models.Vote.post_id)
+    )
+
+
+def delete_vote_pairs(pairs) -> Delete:
+    return (
+        delete(models.Vote)
+        .where(tuple_(models.Vote.user_id, models.Vote.post_id).in_(pairs))
+        .returning(models.Vote.post_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def apply_vote_deltas(deltas: dict[int, int]) -> Update:
+    # one UPDATE for every post, each with its own net change
+    rows = values(column("id", Integer), column("delta", Integer), name="deltas").data(
+        list(deltas.items())
+    )
+    return (
+        update(models.Post)
+        .where(models.Post.id == rows.c.id)
+        .values(vote_count=models.Post.vote_count + rows.c.delta)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,220 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Protocol
+import orjson
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from . import oauth2
+from .config import settings
+from .metrics import RATE_LIMITED
+
+# Token bucket rate limiting as plain ASGI middleware. Requests are matched to
+# the first rule by method and path prefix, then charged one token from the
+# bucket of their user id (valid bearer token) or client IP. Unmatched
+# requests pass through untouched. Behind a proxy run uvicorn with
+# --proxy-headers so the client IP is the real one.
+
+
+class Rule(NamedTuple):
+    name: str
+    methods: frozenset[str]
+    prefix: str
+    capacity: int
+    # tokens added back per second
+    rate: float
+
+
+class Take(NamedTuple):
+    allowed: bool
+    tokens: float
+
+
+def parse_rule(name: str, methods: str, prefix: str, spec: str) -> Rule | None:
+    # "<burst>/<seconds to refill it>", empty turns the rule off
+    if not spec:
+        return None
+    try:
+        capacity, period = spec.split("/")
+        capacity, period = int(capacity), float(period)
+    except ValueError:
+        capacity = period = 0
+    if capacity <= 0 or period <= 0:
+        raise ValueError(
+            f"RATE_LIMIT_{name.upper()}={spec!r}: expected '<burst>/<seconds>'"
+            " with both numbers above 0, or empty to turn the rule off"
+        )
+    return Rule(name, frozenset(methods.split()), prefix, capacity, capacity / period)
+
+
+def default_rules() -> list[Rule]:
+    rules = [
+        # bcrypt per attempt, also slows down password guessing
+        parse_rule("login", "POST", "/auth/login", settings.RATE_LIMIT_LOGIN),
+        parse_rule("read", "GET", "/posts", settings.RATE_LIMIT_READ),
+        parse_rule("write", "POST PUT PATCH DELETE", "/", settings.RATE_LIMIT_WRITE),
+    ]
+    return [rule for rule in rules if rule]
+
+
+class Backend(Protocol):
+    # True when calls do network I/O, the middleware then runs them in a thread
+    blocking: bool
+
+    def take(self, key: str, capacity: int, rate: float) -> Take: ...
+
+
+class MemoryBackend:
+    # per process, each worker enforces its own copy of the limits
+    blocking = False
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # least recently used buckets go first, a full bucket loses nothing
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return Take(allowed, tokens)
+
+
+# refill and take in one round trip, atomic across workers
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    # takes any client with redis-py's eval, so tests can pass a fake
+    blocking = True
+
+    def __init__(self, client):
+        self.client = client
+
+    def take(self, key, capacity, rate):
+        allowed, tokens = self.client.eval(
+            TAKE_SCRIPT, 1, key, capacity, rate, time.time()
+        )
+        return Take(bool(allowed), float(tokens))
+
+
+def make_backend() -> Backend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        # optional dependency, only needed when the redis backend is selected
+        import redis
+
+        return RedisBackend(redis.Redis.from_url(settings.RATE_LIMIT_REDIS_URL))
+    return MemoryBackend(settings.RATE_LIMIT_SIZE)
+
+
+def client_key(scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    # cached by token hash, so this is a dict lookup after the first hit
+                    return f"user:{oauth2.verify_access_token(token).id}"
+                except HTTPException:
+                    pass
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def limit_headers(rule: Rule, take: Take) -> list[tuple[bytes, bytes]]:
+    # RateLimit-Reset: seconds until the bucket is full again
+    reset = math.ceil((rule.capacity - take.tokens) / rule.rate)
+    headers = [
+        (b"ratelimit-limit", str(rule.capacity).encode()),
+        (b"ratelimit-remaining", str(int(take.tokens)).encode()),
+        (b"ratelimit-reset", str(reset).encode()),
+        (
+            b"ratelimit-policy",
+            f"{rule.capacity};w={round(rule.capacity / rule.rate)}".encode(),
+        ),
+    ]
+    if not take.allowed:
+        retry_after = math.ceil((1 - take.tokens) / rule.rate)
+        headers.append((b"retry-after", str(retry_after).encode()))
+    return headers
+
+
+REJECTED_BODY = orjson.dumps({"detail": "Too Many Requests"})
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, backend: Backend | None = None, rules=None):
+        self.app = app
+        self.backend = backend or make_backend()
+        self.rules = default_rules() if rules is None else rules
+
+    def match(self, method: str, path: str) -> Rule | None:
+        for rule in self.rules:
+            if method in rule.methods and path.startswith(rule.prefix):
+                return rule
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rule = self.match(scope["method"], scope["path"])
+        if rule is None:
+            return await self.app(scope, receive, send)
+
+        key = f"ratelimit:{rule.name}:{client_key(scope)}"
+        if self.backend.blocking:
+            take = await run_in_threadpool(
+                self.backend.take, key, rule.capacity, rule.rate
+            )
+        else:
+            take = self.backend.take(key, rule.capacity, rule.rate)
+        headers = limit_headers(rule, take)
+
+        if not take.allowed:
+            RATE_LIMITED.labels(rule.name).inc()
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(REJECTED_BODY)).encode()),
+                        *headers,
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": REJECTED_BODY})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
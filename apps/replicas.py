@@ -0,0 +1,146 @@
+import asyncio
+import itertools
+import logging
+from typing import Literal
+from sqlalchemy import Engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+# Read replicas for the read-only GET routes. Sessions from get_read_db /
+# get_async_read_db pick one healthy replica on their first query and keep it
+# for the request. A background task checks every replica and takes the ones
+# that are down or lagging out of rotation, with none left reads go to the
+# primary. A replica that goes down between checks is caught when a session
+# connects to it and taken out of rotation until the next check finds it up.
+
+logger = logging.getLogger(__name__)
+
+# replay lag, 0 while the replica has replayed everything it received so an
+# idle primary doesn't read as lag
+LAG = text(
+    """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(
+            extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+
+def first_line(e: Exception) -> str:
+    return str(e).strip().splitlines()[0]
+
+
+class Replica:
+    def __init__(self, name: str, engine: Engine, async_engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.async_engine = async_engine
+        # assumed up until the first check says otherwise
+        self.healthy = True
+
+    def in_use(self) -> int:
+        # only one of the two engines serves requests, depending on DATABASE_ASYNC
+        return (
+            self.engine.pool.checkedout()
+            + self.async_engine.sync_engine.pool.checkedout()
+        )
+
+    def check(self, max_lag: float):
+        try:
+            with self.engine.connect() as conn:
+                lag = conn.execute(LAG).scalar_one()
+            healthy, reason = not max_lag or lag <= max_lag, f"lagging {lag:.1f}s"
+        except Exception as e:
+            healthy, reason = False, first_line(e)
+        self.set_healthy(healthy, reason)
+
+    def set_healthy(self, healthy: bool, reason: str = ""):
+        if self.healthy and not healthy:
+            logger.warning("replica %s out of rotation: %s", self.name, reason)
+        elif healthy and not self.healthy:
+            logger.info("replica %s back in rotation", self.name)
+        self.healthy = healthy
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        replicas: list[Replica],
+        balance: Literal["round_robin", "least_connections"],
+    ):
+        self.replicas = replicas
+        self.balance = balance
+        self.turn = itertools.count()
+
+    def pick(self) -> Replica | None:
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        if self.balance == "least_connections":
+            return min(healthy, key=Replica.in_use)
+        return healthy[next(self.turn) % len(healthy)]
+
+    def check(self, max_lag: float):
+        for replica in self.replicas:
+            replica.check(max_lag)
+
+    async def checker(self, interval: float, max_lag: float):
+        # started from the app lifespan, runs until cancelled on shutdown
+        while True:
+            await asyncio.to_thread(self.check, max_lag)
+            await asyncio.sleep(interval)
+
+
+class RoutingSession(Session):
+    # reads go to the replica picked for this session. Flushes, insert/update/
+    # delete statements and SELECT ... FOR UPDATE pin the session to the primary
+    # for the rest of its life, so a request reads its own writes. Raw text()
+    # statements count as reads.
+    def __init__(
+        self, replicas: ReplicaSet | None = None, use_async: bool = False, **kw
+    ):
+        super().__init__(**kw)
+        self.replicas = replicas
+        self.use_async = use_async
+        self.pinned = False
+        self.read_bind = None
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self._flushing
+            or isinstance(clause, UpdateBase)
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            self.pinned = True
+        if self.replicas is None or self.pinned:
+            return super().get_bind(mapper, clause=clause, **kw)
+        if self.read_bind is None:
+            self.read_bind = self.connect_replica() or super().get_bind(
+                mapper, clause=clause, **kw
+            )
+        return self.read_bind
+
+    def connect_replica(self) -> Engine | None:
+        # check a connection out of the picked replica's pool and straight back
+        # in, the session's own checkout then reuses it. One that can't connect
+        # leaves the rotation and the next one is tried, the primary last.
+        while (replica := self.replicas.pick()) is not None:
+            # AsyncSession runs its sync Session on the async engine's proxy
+            bind = (
+                replica.async_engine.sync_engine if self.use_async else replica.engine
+            )
+            try:
+                with bind.connect():
+                    return bind
+            except OperationalError as e:
+                replica.set_healthy(False, first_line(e))
+        return None
+
+    def use_primary(self):
+        # the rest of this session reads from the primary
+        self.pinned = True
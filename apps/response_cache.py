@@ -0,0 +1,237 @@
+import hashlib
+import itertools
+import math
+import threading
+from collections import OrderedDict
+from typing import NamedTuple, Protocol
+from urllib.parse import urlencode
+from fastapi import Response, status
+from fastapi.concurrency import run_in_threadpool
+from .cache import MISSING, TTLCache
+from .config import settings
+
+# Read-through cache of serialized GET /posts and GET /posts/{id} bodies.
+# Keys carry a generation number that writes bump, old entries simply stop being
+# read and age out. The generation is read before the database, so a reader that
+# loaded a row just before a write stores it under the old generation where
+# nobody looks, rather than over the fresh entry.
+#
+# Each post has its own generation, bumped by edits, deletes and votes. List
+# pages can contain any post and share one generation, bumped when posts are
+# created, edited or deleted. Votes leave it alone: they are by far the most
+# frequent write, and bumping on each one would keep the list cache empty, so
+# vote counts on cached list pages can lag by up to RESPONSE_CACHE_TTL seconds.
+#
+# With read replicas a miss could load a post from a replica that hasn't replayed
+# the write which bumped the generation, and store the old body under the new
+# one for the full TTL. Each bump leaves a marker for as long as a replica in
+# rotation may lag, and misses on a marked generation read the primary. All
+# other misses stay on the replicas.
+#
+# The memory backend is per process: with several workers use redis so an
+# invalidation reaches every worker, otherwise other workers serve stale pages
+# for up to RESPONSE_CACHE_TTL seconds.
+
+LISTS = "posts:list:generation"
+# per post generations must outlive every entry stored under them, or an expired
+# generation restarting from 0 could reach an old entry again
+ITEM_GENERATION_TTL = settings.RESPONSE_CACHE_TTL * 2 + 60
+READS_FROM_REPLICAS = bool(settings.DATABASE_REPLICA_URLS)
+# a replica is checked at most MAX_LAG behind and can fall further behind until
+# the next check. 0 when lag isn't checked, every miss then reads the primary.
+REPLICA_LAG_WINDOW = settings.DATABASE_REPLICA_MAX_LAG and (
+    settings.DATABASE_REPLICA_MAX_LAG + settings.DATABASE_REPLICA_CHECK_INTERVAL
+)
+
+
+class Backend(Protocol):
+    # True when calls do network I/O, async routers then run them in a thread
+    blocking: bool
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes, ttl: int): ...
+
+    def delete(self, key: str): ...
+
+    def generation(self, key: str) -> int: ...
+
+    def bump(self, key: str, ttl: int | None = None): ...
+
+
+class NullBackend:
+    blocking = False
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def generation(self, key):
+        return 0
+
+    def bump(self, key, ttl=None):
+        pass
+
+
+class MemoryBackend:
+    blocking = False
+
+    def __init__(self, maxsize: int):
+        self._entries = TTLCache(maxsize, 0)
+        # generations come from one counter and are kept for as many keys as
+        # entries. A key whose generation was evicted reads the highest evicted
+        # one, so no key ever goes back to a generation it had before.
+        self._generations: OrderedDict[str, int] = OrderedDict()
+        self._maxsize = maxsize
+        self._counter = itertools.count(1)
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        return None if value is MISSING else value
+
+    def set(self, key, value, ttl):
+        self._entries.set(key, value, ttl=ttl)
+
+    def delete(self, key):
+        self._entries.delete(key)
+
+    def generation(self, key):
+        return self._generations.get(key, self._floor)
+
+    def bump(self, key, ttl=None):
+        with self._lock:
+            self._generations[key] = next(self._counter)
+            self._generations.move_to_end(key)
+            if len(self._generations) > self._maxsize:
+                _, evicted = self._generations.popitem(last=False)
+                self._floor = max(self._floor, evicted)
+
+
+class RedisBackend:
+    # takes any client with redis-py's get/set/delete/incr/expire, so tests can
+    # pass a fake
+    blocking = True
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def generation(self, key):
+        return int(self.client.get(key) or 0)
+
+    def bump(self, key, ttl=None):
+        self.client.incr(key)
+        if ttl:
+            self.client.expire(key, ttl)
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+def make_backend() -> Backend:
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        # optional dependency, only needed when the redis backend is selected
+        import redis
+
+        return RedisBackend(redis.Redis.from_url(settings.RESPONSE_CACHE_REDIS_URL))
+    if settings.RESPONSE_CACHE_BACKEND == "memory":
+        return MemoryBackend(settings.RESPONSE_CACHE_SIZE)
+    return NullBackend()
+
+
+backend: Backend = make_backend()
+
+
+def item_generation(id: int) -> str:
+    return f"posts:item:{id}:generation"
+
+
+def post_key(id: int) -> str:
+    # read it once, before loading the post, and use it for lookup and store
+    return f"posts:item:{id}:{backend.generation(item_generation(id))}"
+
+
+def post_list_key(**params) -> str:
+    query = urlencode(sorted((k, v) for k, v in params.items() if v is not None))
+    return f"posts:list:{backend.generation(LISTS)}:{query}"
+
+
+def lookup(key: str) -> CachedResponse | None:
+    raw = backend.get(key)
+    if raw is None:
+        return None
+    etag, body = raw.split(b"\n", 1)
+    return CachedResponse(etag.decode(), body)
+
+
+def written(generation: str) -> str:
+    return f"{generation}:written"
+
+
+def fill_from_primary(db, generation: str):
+    # pin the read session to the primary when a write bumped this generation
+    # recently enough that a replica may not have it yet. Without a cache
+    # nothing is stored, so reads stay on the replicas.
+    if not READS_FROM_REPLICAS or isinstance(backend, NullBackend):
+        return
+    if not REPLICA_LAG_WINDOW or backend.get(written(generation)) is not None:
+        getattr(db, "sync_session", db).use_primary()
+
+
+def store(key: str, body: bytes) -> CachedResponse:
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    backend.set(key, etag.encode() + b"\n" + body, settings.RESPONSE_CACHE_TTL)
+    return CachedResponse(etag, body)
+
+
+def bump(generation: str, ttl: int | None = None):
+    # marker first, a reader that sees the new generation then sees it too
+    if READS_FROM_REPLICAS and REPLICA_LAG_WINDOW:
+        backend.set(written(generation), b"1", math.ceil(REPLICA_LAG_WINDOW))
+    backend.bump(generation, ttl)
+
+
+def invalidate_post(id: int | None = None):
+    # creates, edits and deletes. id None for new posts, they only change lists.
+    if id is not None:
+        bump(item_generation(id), ITEM_GENERATION_TTL)
+    bump(LISTS)
+
+
+def invalidate_votes(ids):
+    # vote counts only, list pages keep theirs until they expire
+    for id in ids:
+        bump(item_generation(id), ITEM_GENERATION_TTL)
+
+
+async def run(fn, *args, **kwargs):
+    # async routers: don't block the event loop on a network backend
+    if backend.blocking:
+        return await run_in_threadpool(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+def respond(cached: CachedResponse, if_none_match: str | None) -> Response:
+    headers = {"ETag": cached.etag}
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        if cached.etag in tags or "*" in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
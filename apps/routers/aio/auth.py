@@ -0,0 +1,43 @@
+from fastapi import APIRouter, status, HTTPException, Depends
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated
+from ...database import get_async_db
+from ... import schemas, models, utils, oauth2
+
+router = APIRouter(prefix="/auth", tags=["Authentication"])
+
+
+@router.post("/login", response_model=schemas.Token)
+async def login(
+    request: Annotated[OAuth2PasswordRequestForm, Depends()],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    user = await db.scalar(
+        select(models.User).where(models.User.email == request.username)
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid Credentials",
+        )
+    # bcrypt runs in the password process pool, 503 if it's saturated
+    valid, new_hash = await utils.verify_password_async(request.password, user.password)
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid Credentials",
+        )
+    if new_hash:
+        # stored hash used an old cost/scheme, upgrade it while we have the password
+        user.password = new_hash
+        await db.commit()
+
+    token = schemas.Token(
+        access_token=oauth2.create_access_token(
+            data={"user_id": user.id, "email": user.email}
+        ),
+        token_type="bearer",
+    )
+    return token
@@ -0,0 +1,265 @@
+from typing import Annotated
+from fastapi import Header, Response, status, HTTPException, Depends, APIRouter
+from psycopg import DatabaseError
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ... import models, schemas, oauth2, queries, response_cache, serializers
+from ...config import settings
+from ...database import get_async_db, get_async_read_db
+from ...pagination import clamp_limit
+
+
+router = APIRouter(prefix="/posts", tags=["Post"])
+
+
+@router.get("/", response_model=schemas.PostPage)
+async def get_posts(
+    db: Annotated[AsyncSession, Depends(get_async_read_db)],
+    limit: int | None = None,
+    cursor: str | None = None,
+    search: str | None = None,
+    owner_id: int | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    limit = clamp_limit(
+        limit, settings.POSTS_PAGE_SIZE_DEFAULT, settings.POSTS_PAGE_SIZE_MAX
+    )
+    key = await response_cache.run(
+        response_cache.post_list_key,
+        limit=limit,
+        cursor=cursor,
+        search=search,
+        owner_id=owner_id,
+    )
+    cached = await response_cache.run(response_cache.lookup, key)
+    if cached:
+        return response_cache.respond(cached, if_none_match)
+    await response_cache.run(response_cache.fill_from_primary, db, response_cache.LISTS)
+    try:
+        result = await db.execute(queries.post_page(limit, cursor, search, owner_id))
+        posts = result.all()
+        if not posts:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No post found"
+            )
+        # rows skip per-row validation, orjson encodes the page in one pass
+        body = serializers.dumps(
+            queries.page_response(posts, limit, ranked=bool(search))
+        )
+        cached = await response_cache.run(response_cache.store, key, body)
+        return response_cache.respond(cached, if_none_match)
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database Error: {e}",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected Error: {e}",
+        )
+
+
+# precomputed hot posts, registered before /{id} so "trending" isn't read as an id
+@router.get("/trending", response_model=schemas.PostPage)
+async def get_trending_posts(
+    db: Annotated[AsyncSession, Depends(get_async_read_db)],
+    limit: int | None = None,
+    cursor: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    limit = clamp_limit(
+        limit, settings.POSTS_PAGE_SIZE_DEFAULT, settings.POSTS_PAGE_SIZE_MAX
+    )
+    key = await response_cache.run(
+        response_cache.post_list_key, feed="trending", limit=limit, cursor=cursor
+    )
+    cached = await response_cache.run(response_cache.lookup, key)
+    if cached:
+        return response_cache.respond(cached, if_none_match)
+    await response_cache.run(response_cache.fill_from_primary, db, response_cache.LISTS)
+    try:
+        result = await db.execute(queries.trending_page(limit, cursor))
+        posts = result.all()
+        if not posts:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No post found"
+            )
+        body = serializers.dumps(queries.page_response(posts, limit, ranked=True))
+        cached = await response_cache.run(response_cache.store, key, body)
+        return response_cache.respond(cached, if_none_match)
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database Error: {e}",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected Error: {e}",
+        )
+
+
+@router.post(
+    "/", status_code=status.HTTP_201_CREATED, response_model=schemas.PostResponse
+)
+async def createposts(
+    request: schemas.PostCreate,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[schemas.UserOut, Depends(oauth2.get_current_user_async)],
+):
+    new_post = models.Post(
+        title=request.title,
+        content=request.content,
+        published=request.published,
+        owner_id=current_user.id,
+    )
+    try:
+        db.add(new_post)
+        await db.commit()
+        await response_cache.run(response_cache.invalidate_post)
+        # load the owner up front, serialization can't lazy load on an async session
+        new_post = await db.scalar(queries.post_with_owner(new_post.id))
+    except DatabaseError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database Error: {e}",
+        )
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected Error: {e}",
+        )
+    return new_post
+
+
+@router.get("/{id}", response_model=schemas.PostVote)
+async def get_post(
+    id: int,
+    db: Annotated[AsyncSession, Depends(get_async_read_db)],
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    key = await response_cache.run(response_cache.post_key, id)
+    cached = await response_cache.run(response_cache.lookup, key)
+    if cached:
+        return response_cache.respond(cached, if_none_match)
+    await response_cache.run(
+        response_cache.fill_from_primary, db, response_cache.item_generation(id)
+    )
+    try:
+        post = (await db.execute(queries.post_by_id(id))).first()
+        if post:
+            body = schemas.PostVote.model_validate(post).model_dump_json().encode()
+            cached = await response_cache.run(response_cache.store, key, body)
+            return response_cache.respond(cached, if_none_match)
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail=f"Post not found"
+            )
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database Error: {e}",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected Error: {e}",
+        )
+
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_posts(
+    id: int,
+    current_user: Annotated[schemas.UserOut, Depends(oauth2.get_current_user_async)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    try:
+        post = await db.get(models.Post, id)
+        if post:
+            if post.owner_id == current_user.id:
+                await db.execute(delete(models.Post).where(models.Post.id == id))
+                await db.commit()
+                await response_cache.run(response_cache.invalidate_post, id)
+                return Response(status_code=status.HTTP_204_NO_CONTENT)
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized Access"
+                )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
+            )
+    except DatabaseError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Database Error: {e}"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected Error: {e}",
+        )
+
+
+@router.patch("/{id}", response_model=schemas.PostResponse)
+async def update_posts(
+    id: int,
+    post: schemas.PostPatch,
+    current_user: Annotated[schemas.UserOut, Depends(oauth2.get_current_user_async)],
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+):
+    post_dict = post.model_dump(exclude_unset=True)
+    try:
+        if not post_dict:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid/No fields provided",
+            )
+
+        data = await db.scalar(queries.post_with_owner(id))
+        if data:
+            if data.owner_id == current_user.id:
+                await db.execute(
+                    update(models.Post)
+                    .where(models.Post.id == id)
+                    .values(**post_dict)
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                await response_cache.run(response_cache.invalidate_post, id)
+                return await db.scalar(queries.post_with_owner(id))
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized Access"
+                )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No data found"
+            )
+    except DatabaseError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database Error: {e}",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected Error: {e}",
+        )
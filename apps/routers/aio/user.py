@@ -0,0 +1,60 @@
+from typing import Annotated
+from fastapi import status, HTTPException, Depends, APIRouter
+from psycopg import DatabaseError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ... import models, schemas, utils
+from ...database import get_async_db, get_async_read_db
+
+router = APIRouter(prefix="/users", tags=["User"])
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
+async def create_users(
+    user: schemas.UserCreate, db: Annotated[AsyncSession, Depends(get_async_db)]
+):
+    # password hash, runs in the password process pool
+    user.password = await utils.hash_password_async(user.password)
+
+    try:
+        new_user = models.User(**user.model_dump())
+        db.add(new_user)
+        await db.commit()
+        await db.refresh(new_user)
+        return new_user
+    except DatabaseError as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database Error: {e}",
+        )
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected Error: {e}",
+        )
+
+
+@router.get("/{id}", response_model=schemas.UserOut)
+async def get_users(id: int, db: Annotated[AsyncSession, Depends(get_async_read_db)]):
+    try:
+        user = await db.get(models.User, id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not Found",
+            )
+
+        return user
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {e}",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected error: {e}",
+        )
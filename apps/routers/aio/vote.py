@@ -0,0 +1,91 @@
+from typing import Annotated
+from fastapi import Response, status, HTTPException, Depends, APIRouter
+from sqlalchemy.ext.asyncio import AsyncSession
+from ... import models, schemas, oauth2, queries, response_cache, votes
+from ...config import settings
+from ...vote_queue import vote_queue
+from ...database import get_async_db
+
+router = APIRouter(prefix="/vote", tags=["Vote"])
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def vote(
+    vote: schemas.Vote,
+    response: Response,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[schemas.UserOut, Depends(oauth2.get_current_user_async)],
+):
+    if settings.VOTE_WRITE_BEHIND:
+        # validated and queued, apps/vote_queue.py writes it with the next batch
+        vote_queue.submit(current_user.id, vote.post_id, vote.dir)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": "Vote accepted"}
+    state = (
+        await db.execute(queries.vote_state(vote.post_id, current_user.id))
+    ).first()
+    if not state:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Post not found",
+        )
+    if vote.dir == 1:
+        if state.voted:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="User already has voted on this post",
+            )
+        new_vote = models.Vote(user_id=current_user.id, post_id=vote.post_id)
+        db.add(new_vote)
+        # same transaction as the vote row so posts.vote_count never drifts
+        await db.execute(queries.change_vote_count(vote.post_id, 1))
+        await db.commit()
+        await response_cache.run(response_cache.invalidate_votes, [vote.post_id])
+        return {"message": "Vote added successfully"}
+    else:
+        if not state.voted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Vote doesn't exist"
+            )
+        deleted = await db.scalar(queries.delete_votes(current_user.id, [vote.post_id]))
+        if deleted is None:
+            # a concurrent unvote by the same user removed it first
+            await db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Vote doesn't exist"
+            )
+        await db.execute(queries.change_vote_count(vote.post_id, -1))
+        await db.commit()
+        await response_cache.run(response_cache.invalidate_votes, [vote.post_id])
+        return {"message": "Vote successfully deleted"}
+
+
+@router.post("/batch", response_model=schemas.VoteBatchResult)
+async def vote_batch(
+    batch: schemas.VoteBatch,
+    db: Annotated[AsyncSession, Depends(get_async_db)],
+    current_user: Annotated[schemas.UserOut, Depends(oauth2.get_current_user_async)],
+):
+    final = votes.final_directions(batch.votes)
+    existing = set(await db.scalars(queries.lock_posts(final)))
+    to_add = [post_id for post_id, dir in final.items() if dir and post_id in existing]
+    to_remove = [
+        post_id for post_id, dir in final.items() if not dir and post_id in existing
+    ]
+
+    added, removed = set(), set()
+    if to_add:
+        added = set(await db.scalars(queries.insert_votes(current_user.id, to_add)))
+    if to_remove:
+        removed = set(
+            await db.scalars(queries.delete_votes(current_user.id, to_remove))
+        )
+    if added:
+        await db.execute(queries.change_vote_counts(added, 1))
+    if removed:
+        await db.execute(queries.change_vote_counts(removed, -1))
+    await db.commit()
+
+    if added or removed:
+        await response_cache.run(response_cache.invalidate_votes, added | removed)
+    return {"results": votes.results(batch.votes, existing, added, removed)}
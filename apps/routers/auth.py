@@ -1,3 +1,4 @@
+import logging
 from fastapi import APIRouter, status, HTTPException, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
@@ -7,6 +8,8 @@ from .. import schemas, models, utils, oauth2
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+logger = logging.getLogger(__name__)
+
 
 # OAuth2PasswordRequestForm makes the data as a form so require form-data in postman instead of body
 @router.post("/login", response_model=schemas.Token)
@@ -23,24 +26,32 @@ def login(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Invalid Credentials",
             )
-        if not utils.verify(request.password, user.password):
+        # bcrypt runs in the password process pool, 503 if it's saturated
+        valid, new_hash = utils.verify_password(request.password, user.password)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Invalid Credentials",
             )
+        if new_hash:
+            # stored hash used an old cost/scheme, upgrade it while we have the password
+            user.password = new_hash
+            db.commit()
 
         # create and return token
         # Pydantic validates models on initialization so doing a blank schemas.Token() won't work
         token = schemas.Token(
-            access_token=oauth2.create_access_token(data={"user_id": user.id}),
+            access_token=oauth2.create_access_token(
+                data={"user_id": user.id, "email": user.email}
+            ),
             token_type="bearer",
         )
         return token
     except HTTPException:
         raise
-    except Exception as e:
-        print({e})
-        HTTPException(
+    except Exception:
+        logger.exception("login failed")
+        raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred",
         )
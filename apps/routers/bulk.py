@@ -0,0 +1,119 @@
+from typing import Annotated, Literal
+from fastapi import Request, status, HTTPException, Depends, APIRouter
+from fastapi.responses import StreamingResponse
+from psycopg import DatabaseError
+from .. import bulk, schemas, oauth2, response_cache
+from ..config import settings
+from ..database import async_engine
+
+# Bulk endpoints stream request/response bodies, so they are async in both
+# DATABASE_ASYNC modes and talk to psycopg 3 through the async engine. Included
+# ahead of the post router so /posts/{id} doesn't capture their paths.
+
+router = APIRouter(prefix="/posts", tags=["Post"])
+
+BULK_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "array",
+                    "items": {"$ref": "#/components/schemas/PostCreate"},
+                }
+            },
+            "application/x-ndjson": {
+                "schema": {"$ref": "#/components/schemas/PostCreate"}
+            },
+        },
+    }
+}
+
+
+@router.post(
+    "/bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=schemas.BulkResult,
+    openapi_extra=BULK_BODY,
+)
+async def bulk_posts(
+    request: Request,
+    current_user: Annotated[schemas.UserOut, Depends(oauth2.get_current_user_async)],
+):
+    result = schemas.BulkResult(inserted=0, chunks=[])
+    content_type = request.headers.get("content-type", "application/json")
+
+    async with async_engine.connect() as conn:
+        driver = (await conn.get_raw_connection()).driver_connection
+
+        async def flush(first_index, items, posts, errors, invalid):
+            chunk = schemas.BulkChunk(
+                first_index=first_index,
+                items=items,
+                inserted=0,
+                invalid=invalid,
+                errors=errors,
+            )
+            if posts:
+                try:
+                    await bulk.copy_posts(driver, current_user.id, posts)
+                    chunk.inserted = len(posts)
+                    result.inserted += len(posts)
+                except DatabaseError as e:
+                    chunk.failed = f"Database Error: {e}"
+            result.chunks.append(chunk)
+
+        first_index, items, posts, errors, invalid = 0, 0, [], [], 0
+        try:
+            async for index, post, error in bulk.parse_items(
+                request.stream(), content_type
+            ):
+                items += 1
+                if post is not None:
+                    posts.append(post)
+                else:
+                    invalid += 1
+                    if len(errors) < settings.POSTS_BULK_MAX_ERRORS:
+                        errors.append(schemas.BulkItemError(index=index, error=error))
+                if items == settings.POSTS_BULK_CHUNK_SIZE:
+                    await flush(first_index, items, posts, errors, invalid)
+                    first_index, items, posts, errors, invalid = index + 1, 0, [], [], 0
+        except ValueError as e:
+            if not result.inserted:
+                # nothing committed yet, the upload as a whole was malformed
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+                )
+            result.error = str(e)
+        if items:
+            await flush(first_index, items, posts, errors, invalid)
+
+    if result.inserted:
+        await response_cache.run(response_cache.invalidate_post)
+    return result
+
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+# the caller's posts or votes for analytics, streamed from a server-side cursor
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}
+    },
+)
+async def export_posts(
+    current_user: Annotated[schemas.UserOut, Depends(oauth2.get_current_user_async)],
+    dataset: Literal["posts", "votes"] = "posts",
+    format: Literal["ndjson", "csv"] = "ndjson",
+):
+    rows = bulk.export_rows(
+        bulk.EXPORTS[dataset](current_user.id), format, settings.POSTS_EXPORT_BATCH_SIZE
+    )
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
@@ -1,28 +1,41 @@
 from typing import Annotated
-from fastapi import Response, status, HTTPException, Depends, APIRouter
+from fastapi import Header, Response, status, HTTPException, Depends, APIRouter
 from psycopg import DatabaseError
-from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from .. import models, schemas, oauth2
-from ..database import get_db
+from .. import models, schemas, oauth2, queries, response_cache, serializers
+from ..config import settings
+from ..database import get_db, get_read_db
+from ..pagination import clamp_limit
 
 
 router = APIRouter(prefix="/posts", tags=["Post"])
 
 
-# return as list since multiple items can be returned
+# return a page of posts plus a cursor for the next one
 # @router.get("/", response_model=list[schemas.PostResponse])
-@router.get("/", response_model=list[schemas.PostVote])
-def get_posts(db: Annotated[Session, Depends(get_db)], limit: int = 10):
+@router.get("/", response_model=schemas.PostPage)
+def get_posts(
+    db: Annotated[Session, Depends(get_read_db)],
+    limit: int | None = None,
+    cursor: str | None = None,
+    search: str | None = None,
+    owner_id: int | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    limit = clamp_limit(
+        limit, settings.POSTS_PAGE_SIZE_DEFAULT, settings.POSTS_PAGE_SIZE_MAX
+    )
+    key = response_cache.post_list_key(
+        limit=limit, cursor=cursor, search=search, owner_id=owner_id
+    )
+    cached = response_cache.lookup(key)
+    if cached:
+        return response_cache.respond(cached, if_none_match)
+    response_cache.fill_from_primary(db, response_cache.LISTS)
     try:
         # posts = db.query(models.Post).limit(limit).all()
-        posts = (
-            db.query(models.Post, func.count(models.Vote.post_id).label("votes"))
-            .join(models.Vote, models.Post.id == models.Vote.post_id, isouter=True)
-            .group_by(models.Post.id)
-            .all()
-        )
+        posts = db.execute(queries.post_page(limit, cursor, search, owner_id)).all()
         if not posts:
             # will not work since HTTPException is subclass of Exception
             # Exception catches the HTTPException and status gets converted to 500 from 404
@@ -30,7 +43,51 @@ def get_posts(db: Annotated[Session, Depends(get_db)], limit: int = 10):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="No post found"
             )
-        return posts
+        # rows skip per-row validation, orjson encodes the page in one pass
+        body = serializers.dumps(
+            queries.page_response(posts, limit, ranked=bool(search))
+        )
+        cached = response_cache.store(key, body)
+        return response_cache.respond(cached, if_none_match)
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database Error: {e}",
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected Error: {e}",
+        )
+
+
+# precomputed hot posts, registered before /{id} so "trending" isn't read as an id
+@router.get("/trending", response_model=schemas.PostPage)
+def get_trending_posts(
+    db: Annotated[Session, Depends(get_read_db)],
+    limit: int | None = None,
+    cursor: str | None = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    limit = clamp_limit(
+        limit, settings.POSTS_PAGE_SIZE_DEFAULT, settings.POSTS_PAGE_SIZE_MAX
+    )
+    key = response_cache.post_list_key(feed="trending", limit=limit, cursor=cursor)
+    cached = response_cache.lookup(key)
+    if cached:
+        return response_cache.respond(cached, if_none_match)
+    response_cache.fill_from_primary(db, response_cache.LISTS)
+    try:
+        posts = db.execute(queries.trending_page(limit, cursor)).all()
+        if not posts:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="No post found"
+            )
+        body = serializers.dumps(queries.page_response(posts, limit, ranked=True))
+        cached = response_cache.store(key, body)
+        return response_cache.respond(cached, if_none_match)
     except DatabaseError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -63,6 +120,7 @@ def createposts(
     try:
         db.add(new_post)
         db.commit()
+        response_cache.invalidate_post()
     except DatabaseError as e:
         db.rollback()
         raise HTTPException(
@@ -80,19 +138,24 @@ def createposts(
 
 @router.get("/{id}", response_model=schemas.PostVote)
 # having {id} in get automatically makes it available to be added to get_posts as a parameter
-def get_posts(id: int, db: Session = Depends(get_db)):
+def get_posts(
+    id: int,
+    db: Session = Depends(get_read_db),
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    key = response_cache.post_key(id)
+    cached = response_cache.lookup(key)
+    if cached:
+        return response_cache.respond(cached, if_none_match)
+    response_cache.fill_from_primary(db, response_cache.item_generation(id))
     try:
         # must have first() or all() or something of the type to actually return the found values
         # post = db.query(models.Post).filter(models.Post.id == id).first()
-        post = (
-            db.query(models.Post, func.count(models.Vote.post_id).label("votes"))
-            .join(models.Vote, models.Post.id == models.Vote.post_id, isouter=True)
-            .filter(models.Post.id == id)
-            .group_by(models.Post.id)
-            .first()
-        )
+        post = db.execute(queries.post_by_id(id)).first()
         if post:
-            return post
+            body = schemas.PostVote.model_validate(post).model_dump_json().encode()
+            cached = response_cache.store(key, body)
+            return response_cache.respond(cached, if_none_match)
         else:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail=f"Post not found"
@@ -127,6 +190,7 @@ def delete_posts(
             if post.owner_id == current_user.id:
                 post_to_delete.delete(synchronize_session="auto")
                 db.commit()
+                response_cache.invalidate_post(id)
                 # nothing returned for 204 ever.
                 # return 204 response instead
                 return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -175,6 +239,7 @@ def update_posts(
             if data.owner_id == current_user.id:
                 post_query.update(post_dict, synchronize_session=False)
                 db.commit()
+                response_cache.invalidate_post(id)
                 db.refresh(data)
                 return data
             else:
@@ -3,15 +3,15 @@ from fastapi import status, HTTPException, Depends, APIRouter
 from psycopg import DatabaseError
 from sqlalchemy.orm import Session
 from .. import models, schemas, utils
-from ..database import get_db
+from ..database import get_db, get_read_db
 
 router = APIRouter(prefix="/users", tags=["User"])
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=schemas.UserOut)
 def create_users(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    # password hash
-    user.password = utils.hash(user.password)
+    # password hash, runs in the password process pool
+    user.password = utils.hash_password(user.password)
 
     try:
         new_user = models.User(**user.model_dump())
@@ -34,10 +34,9 @@ def create_users(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/{id}", response_model=schemas.UserOut)
-def get_users(id: int, db: Annotated[Session, Depends(get_db)]):
+def get_users(id: int, db: Annotated[Session, Depends(get_read_db)]):
     try:
         user = db.query(models.User).filter(models.User.id == id).first()
-        print(f"User: {user}")
         if user is None:
             # will not work since HTTPException is subclass of Exception
             # Exception catches the HTTPException and status gets converted to 500 from 404
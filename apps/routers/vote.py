@@ -1,7 +1,9 @@
 from typing import Annotated
 from fastapi import Response, status, HTTPException, Depends, APIRouter
 from sqlalchemy.orm import Session
-from .. import models, schemas, oauth2
+from .. import models, schemas, oauth2, queries, response_cache, votes
+from ..config import settings
+from ..vote_queue import vote_queue
 from ..database import get_db
 
 router = APIRouter(prefix="/vote", tags=["Vote"])
@@ -10,34 +12,77 @@ router = APIRouter(prefix="/vote", tags=["Vote"])
 @router.post("/", status_code=status.HTTP_201_CREATED)
 def vote(
     vote: schemas.Vote,
+    response: Response,
     db: Annotated[Session, Depends(get_db)],
     current_user: Annotated[schemas.UserOut, Depends(oauth2.get_current_user)],
 ):
-    post = db.query(models.Vote).filter(models.Vote.post_id == vote.post_id)
-    if not post:
+    if settings.VOTE_WRITE_BEHIND:
+        # validated and queued, apps/vote_queue.py writes it with the next batch
+        vote_queue.submit(current_user.id, vote.post_id, vote.dir)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {"message": "Vote accepted"}
+    state = db.execute(queries.vote_state(vote.post_id, current_user.id)).first()
+    if not state:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Post not found",
         )
-    query = db.query(models.Vote).filter(
-        models.Vote.post_id == vote.post_id, models.Vote.user_id == current_user.id
-    )
-    vote_post = query.first()
     if vote.dir == 1:
-        if vote_post:
+        if state.voted:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="User already has voted on this post",
             )
         new_vote = models.Vote(user_id=current_user.id, post_id=vote.post_id)
         db.add(new_vote)
+        # same transaction as the vote row so posts.vote_count never drifts
+        db.execute(queries.change_vote_count(vote.post_id, 1))
         db.commit()
+        response_cache.invalidate_votes([vote.post_id])
         return {"message": "Vote added successfully"}
     else:
-        if not vote_post:
+        if not state.voted:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Vote doesn't exist"
             )
-        query.delete(synchronize_session=False)
+        deleted = db.scalar(queries.delete_votes(current_user.id, [vote.post_id]))
+        if deleted is None:
+            # a concurrent unvote by the same user removed it first
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Vote doesn't exist"
+            )
+        db.execute(queries.change_vote_count(vote.post_id, -1))
         db.commit()
+        response_cache.invalidate_votes([vote.post_id])
         return {"message": "Vote successfully deleted"}
+
+
+# apply many votes in one transaction, each item gets its own result
+@router.post("/batch", response_model=schemas.VoteBatchResult)
+def vote_batch(
+    batch: schemas.VoteBatch,
+    db: Annotated[Session, Depends(get_db)],
+    current_user: Annotated[schemas.UserOut, Depends(oauth2.get_current_user)],
+):
+    final = votes.final_directions(batch.votes)
+    existing = set(db.scalars(queries.lock_posts(final)))
+    to_add = [post_id for post_id, dir in final.items() if dir and post_id in existing]
+    to_remove = [
+        post_id for post_id, dir in final.items() if not dir and post_id in existing
+    ]
+
+    added, removed = set(), set()
+    if to_add:
+        added = set(db.scalars(queries.insert_votes(current_user.id, to_add)))
+    if to_remove:
+        removed = set(db.scalars(queries.delete_votes(current_user.id, to_remove)))
+    if added:
+        db.execute(queries.change_vote_counts(added, 1))
+    if removed:
+        db.execute(queries.change_vote_counts(removed, -1))
+    db.commit()
+
+    if added or removed:
+        response_cache.invalidate_votes(added | removed)
+    return {"results": votes.results(batch.votes, existing, added, removed)}
@@ -1,6 +1,7 @@
 from datetime import datetime
-from typing import Optional, Annotated
+from typing import Literal, Optional, Annotated
 from pydantic import BaseModel, EmailStr, Field
+from .config import settings
 
 
 # TOKEN
@@ -11,6 +12,12 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):  # Used for embedding data to create access token
     id: str | None = None
+    email: str | None = None
+
+
+class CurrentUser(BaseModel):  # user resolved from the token in stateless auth mode
+    id: int
+    email: EmailStr
 
 
 # USER
@@ -65,6 +72,60 @@ class PostVote(BaseModel):
         from_attributes = True
 
 
+class BulkItemError(BaseModel):
+    index: int  # position of the item in the uploaded array/stream
+    error: str
+
+
+class BulkChunk(BaseModel):
+    first_index: int
+    items: int
+    inserted: int
+    invalid: int
+    errors: list[BulkItemError]
+    # set when the COPY itself failed and the whole chunk was rolled back
+    failed: str | None = None
+
+
+class BulkResult(BaseModel):
+    inserted: int
+    chunks: list[BulkChunk]
+    # set when the body stopped parsing after some rows were loaded, later items
+    # weren't read. A body that fails before that is a 400.
+    error: str | None = None
+
+
+class PostPage(BaseModel):
+    data: list[PostVote]
+    # pass back as ?cursor= to fetch the next page, None on the last page
+    next_cursor: str | None = None
+
+
 class Vote(BaseModel):
     post_id: int
     dir: Annotated[int, Field(le=1)]
+
+
+class VoteBatch(BaseModel):
+    # later items for the same post win over earlier ones
+    votes: Annotated[
+        list[Vote], Field(min_length=1, max_length=settings.VOTE_BATCH_MAX_ITEMS)
+    ]
+
+
+class VoteResult(BaseModel):
+    post_id: int
+    dir: int
+    result: Literal[
+        "added",
+        "removed",
+        "already_voted",
+        "not_voted",
+        "post_not_found",
+        "superseded",
+    ]
+
+
+class VoteBatchResult(BaseModel):
+    # same order as the request items
+    results: list[VoteResult]
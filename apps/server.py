@@ -0,0 +1,69 @@
+import argparse
+import math
+import os
+from importlib.util import find_spec
+import uvicorn
+from .config import settings
+
+# Production entry point, replaces `fastapi run` in the Dockerfile:
+#   python -m apps.server [--workers N] [--host HOST] [--port PORT]
+#
+# Runs SERVER_WORKERS uvicorn worker processes (one per available core by
+# default) behind one listening socket, on uvloop and httptools. Workers are
+# spawned and import apps.main themselves, so each has its own engines, pools,
+# password hashing pool and log queue; database.py also drops pooled
+# connections inherited through a fork.
+#
+# The parent supervises the workers and replaces any that exit. SIGHUP restarts
+# them one at a time, each finishing its in-flight requests first, to pick up
+# new code or settings without dropping the socket. SIGTTIN and SIGTTOU add or
+# remove a worker.
+#
+# State kept in memory is per worker: use the redis backends for the response
+# cache and the rate limiter, and expect /metrics to describe the worker that
+# answered. Each worker opens up to DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW
+# connections, size max_connections (or PgBouncer) for workers times that.
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        cores = len(os.sched_getaffinity(0))
+    else:
+        cores = os.cpu_count() or 1
+    # a container's cgroup v2 cpu quota can be below the cores it can see
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m apps.server")
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    args = parser.parse_args(argv)
+
+    uvicorn.run(
+        "apps.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers or available_cores(),
+        # uvloop is optional (not on Windows), plain asyncio otherwise
+        loop="uvloop" if find_spec("uvloop") else "asyncio",
+        http="httptools",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+        # RequestLogMiddleware writes the access log
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import math
+from datetime import timedelta
+from sqlalchemy import Connection, Double, delete, func, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from . import models
+from .config import settings
+from .database import engine
+
+# Keeps post_scores, the table behind GET /posts/trending, up to date. Scores
+# are computed from posts.vote_count, so a refresh never aggregates votes and
+# only touches posts created inside TRENDING_WINDOW_DAYS.
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock held by whichever worker is refreshing, the rest skip a round
+REFRESH_LOCK = 0x54524E44
+
+
+def score(decay: str) -> Double:
+    post = models.Post
+    if decay == "exponential":
+        # each half-life of age is worth a doubling of votes; as created_at is
+        # absolute the score only changes when the votes do
+        half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+        return (
+            func.ln(1 + post.vote_count) / math.log(2)
+            + func.extract("epoch", post.created_at).cast(Double) / half_life
+        ).cast(Double)
+    hours = func.extract("epoch", func.now() - post.created_at).cast(Double) / 3600
+    return (post.vote_count / func.power(hours + 2, settings.TRENDING_GRAVITY)).cast(
+        Double
+    )
+
+
+def refresh(conn: Connection, full: bool = False) -> int | None:
+    # returns the number of posts rescored, None if another refresh is running
+    if not conn.scalar(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK))):
+        return None
+    post, scores = models.Post, models.PostScore
+    window = func.now() - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    conn.execute(
+        delete(scores).where(scores.post_id == post.id, post.created_at <= window)
+    )
+    candidates = (
+        select(post.id, score(settings.TRENDING_DECAY), post.vote_count)
+        .outerjoin(scores, scores.post_id == post.id)
+        .where(post.created_at > window)
+    )
+    if not full and settings.TRENDING_DECAY == "exponential":
+        # new posts and posts whose votes changed since they were last scored
+        candidates = candidates.where(
+            or_(scores.post_id.is_(None), scores.vote_count != post.vote_count)
+        )
+    stmt = insert(scores).from_select(["post_id", "score", "vote_count"], candidates)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[scores.post_id],
+        set_={
+            "score": stmt.excluded.score,
+            "vote_count": stmt.excluded.vote_count,
+            "refreshed_at": func.now(),
+        },
+    )
+    return conn.execute(stmt).rowcount
+
+
+def refresh_now(full: bool = False) -> int | None:
+    with engine.begin() as conn:
+        return refresh(conn, full)
+
+
+async def refresher():
+    # started from the app lifespan, runs until cancelled on shutdown
+    while True:
+        try:
+            await asyncio.to_thread(refresh_now)
+        except Exception:
+            logger.exception("trending refresh failed")
+        await asyncio.sleep(settings.TRENDING_REFRESH_INTERVAL)
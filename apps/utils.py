@@ -1,6 +1,17 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from .config import settings
+from .metrics import PASSWORD_HASH_REJECTED, PASSWORD_HASH_TIME
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
 
 
 def hash(password: str) -> str:
@@ -10,3 +21,129 @@ def hash(password: str) -> str:
 # created here to avoid importing pwd_content everywhere but upto discretion
 def verify(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password, hashed_password) -> tuple[bool, str | None]:
+    # second value is a fresh hash when the stored one uses outdated settings
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# Request handlers go through the *_password helpers below, which run the
+# functions above in a process pool. Only workers + queue jobs may be in flight.
+# A worker that dies (OOM kill, segfault) breaks the whole pool, so a broken
+# pool is replaced and the job retried once before answering 503.
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn, forking a process with live threads and sockets isn't safe
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+def _replace_executor(broken: ProcessPoolExecutor):
+    global _executor
+    with _executor_lock:
+        # another thread may already have replaced it
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Password hashing unavailable, try again shortly",
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+    )
+
+
+def _submit(fn, *args) -> Future:
+    if not _slots.acquire(blocking=False):
+        PASSWORD_HASH_REJECTED.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, try again shortly",
+            headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER)},
+        )
+    try:
+        executor = _get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            _replace_executor(executor)
+            future = _get_executor().submit(fn, *args)
+    except BrokenProcessPool as e:
+        _slots.release()
+        raise _unavailable() from e
+    except BaseException:
+        _slots.release()
+        raise
+    start = time.perf_counter()
+
+    def done(_):
+        _slots.release()
+        PASSWORD_HASH_TIME.labels(fn.__name__).observe(time.perf_counter() - start)
+
+    future.add_done_callback(done)
+    return future
+
+
+def _run(fn, *args):
+    # a job lost with its worker is resubmitted, _submit replaces the pool
+    try:
+        return _submit(fn, *args).result()
+    except BrokenProcessPool:
+        pass
+    try:
+        return _submit(fn, *args).result()
+    except BrokenProcessPool as e:
+        raise _unavailable() from e
+
+
+async def _run_async(fn, *args):
+    try:
+        return await asyncio.wrap_future(_submit(fn, *args))
+    except BrokenProcessPool:
+        pass
+    try:
+        return await asyncio.wrap_future(_submit(fn, *args))
+    except BrokenProcessPool as e:
+        raise _unavailable() from e
+
+
+def hash_password(password: str) -> str:
+    return _run(hash, password)
+
+
+def verify_password(plain_password, hashed_password) -> tuple[bool, str | None]:
+    return _run(verify_and_update, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_async(hash, password)
+
+
+async def verify_password_async(
+    plain_password, hashed_password
+) -> tuple[bool, str | None]:
+    return await _run_async(verify_and_update, plain_password, hashed_password)
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from collections import Counter
+from fastapi import HTTPException, status
+from sqlalchemy.exc import DataError, IntegrityError
+from . import queries, response_cache
+from .config import settings
+from .database import AsyncSessionLocal
+from .metrics import VOTE_FLUSH_ITEMS, VOTE_QUEUE_DEPTH, VOTES_DROPPED
+
+# Write-behind vote ingestion (VOTE_WRITE_BEHIND). POST /vote/ only queues the
+# vote, a single flusher task on the event loop collects queued votes until
+# VOTE_FLUSH_SIZE distinct (user, post) pairs or VOTE_FLUSH_INTERVAL, keeps the
+# last direction per pair and writes the batch in one transaction. Hot posts
+# then take one row lock and one vote_count update per flush instead of one per
+# vote. Runs on the async engine in both DATABASE_ASYNC modes, like the bulk
+# endpoints.
+
+logger = logging.getLogger(__name__)
+
+STOP = object()
+FLUSH_ATTEMPTS = 3
+
+
+class VoteQueue:
+    def __init__(self, maxsize: int, flush_size: int, flush_interval: float):
+        self.maxsize = maxsize
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._flusher: asyncio.Task | None = None
+
+    def start(self):
+        # from the app lifespan, binds the queue to the running loop
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._flusher = asyncio.create_task(self.flusher())
+        VOTE_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    async def stop(self):
+        # no new requests by now, everything queued so far is written first
+        if self._flusher is None:
+            return
+        self._queue.put_nowait(STOP)
+        await self._flusher
+        self._flusher = None
+
+    def submit(self, user_id: int, post_id: int, dir: int):
+        # safe from the sync routers' threadpool as well as the event loop.
+        # asyncio.Queue isn't thread-safe, so the put always runs on the loop
+        # and the size check is only approximate.
+        if self._flusher is None or self._flusher.done():
+            # not started, or the flusher died: nothing would write the vote
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Vote queue unavailable",
+            )
+        if self._queue.qsize() >= self.maxsize:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Vote queue full, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        self._loop.call_soon_threadsafe(
+            self._queue.put_nowait, (user_id, post_id, 1 if dir == 1 else 0)
+        )
+
+    async def flusher(self):
+        while True:
+            item = await self._queue.get()
+            if item is STOP:
+                return
+            batch: dict[tuple[int, int], int] = {}
+            received = 0
+            deadline = self._loop.time() + self.flush_interval
+            stopping = False
+            while True:
+                user_id, post_id, dir = item
+                # later votes for the same pair replace earlier ones
+                batch[user_id, post_id] = dir
+                received += 1
+                if len(batch) >= self.flush_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - self._loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), remaining)
+                    except TimeoutError:
+                        break
+                if item is STOP:
+                    stopping = True
+                    break
+            VOTE_FLUSH_ITEMS.labels("received").observe(received)
+            VOTE_FLUSH_ITEMS.labels("coalesced").observe(len(batch))
+            await self.flush(batch)
+            if stopping:
+                return
+
+    async def flush(self, batch: dict[tuple[int, int], int]):
+        changed = await self.write(batch)
+        if changed:
+            await response_cache.run(response_cache.invalidate_votes, changed)
+
+    async def write(self, batch: dict[tuple[int, int], int]) -> set[int]:
+        for attempt in range(1, FLUSH_ATTEMPTS + 1):
+            try:
+                return await write(batch)
+            except (IntegrityError, DataError):
+                # the batch itself is bad, e.g. a vote by a user deleted since.
+                # Retrying won't help, halve it until only that vote is dropped.
+                if len(batch) == 1:
+                    logger.exception("vote dropped", extra={"vote": next(iter(batch))})
+                    VOTES_DROPPED.inc()
+                    return set()
+                pairs = list(batch.items())
+                half = len(pairs) // 2
+                first = await self.write(dict(pairs[:half]))
+                return first | await self.write(dict(pairs[half:]))
+            except Exception:
+                logger.exception(
+                    "vote flush failed", extra={"votes": len(batch), "attempt": attempt}
+                )
+                await asyncio.sleep(0.1 * 2**attempt)
+        VOTES_DROPPED.inc(len(batch))
+        return set()
+
+
+async def write(batch: dict[tuple[int, int], int]) -> set[int]:
+    # same order of statements as POST /vote/batch, for many users at once
+    async with AsyncSessionLocal() as db:
+        existing = set(await db.scalars(queries.lock_posts({p for _, p in batch})))
+        to_add = [pair for pair, dir in batch.items() if dir and pair[1] in existing]
+        to_remove = [
+            pair for pair, dir in batch.items() if not dir and pair[1] in existing
+        ]
+        deltas = Counter()
+        if to_add:
+            deltas.update(await db.scalars(queries.insert_vote_pairs(to_add)))
+        if to_remove:
+            deltas.subtract(await db.scalars(queries.delete_vote_pairs(to_remove)))
+        deltas = {post_id: delta for post_id, delta in deltas.items() if delta}
+        if deltas:
+            await db.execute(queries.apply_vote_deltas(deltas))
+        await db.commit()
+    return set(deltas)
+
+
+vote_queue = VoteQueue(
+    settings.VOTE_QUEUE_SIZE, settings.VOTE_FLUSH_SIZE, settings.VOTE_FLUSH_INTERVAL
+)
@@ -0,0 +1,31 @@
+from . import schemas
+
+# Planning and reporting for vote batches, shared by the sync and async routers.
+
+
+def final_directions(items: list[schemas.Vote]) -> dict[int, int]:
+    # post_id -> 1 (vote) or 0 (unvote), the last item for a post wins
+    return {item.post_id: 1 if item.dir == 1 else 0 for item in items}
+
+
+def results(
+    items: list[schemas.Vote],
+    existing: set[int],
+    added: set[int],
+    removed: set[int],
+) -> list[schemas.VoteResult]:
+    last = {item.post_id: i for i, item in enumerate(items)}
+    out = []
+    for i, item in enumerate(items):
+        if last[item.post_id] != i:
+            result = "superseded"
+        elif item.post_id not in existing:
+            result = "post_not_found"
+        elif item.dir == 1:
+            result = "added" if item.post_id in added else "already_voted"
+        else:
+            result = "removed" if item.post_id in removed else "not_voted"
+        out.append(
+            schemas.VoteResult(post_id=item.post_id, dir=item.dir, result=result)
+        )
+    return out
@@ -0,0 +1,56 @@
+import argparse
+import random
+import time
+from apps import oauth2
+
+# Micro-benchmark of the auth dependency (token verify + stateless user) with
+# the decoded-token cache off and on, over 1k/10k/100k distinct live tokens.
+# No database needed: stateless mode resolves users from the token claims.
+#   python -m benchmarks.auth --calls 200000
+
+
+def run(tokens: list[str], calls: int) -> float:
+    # returns seconds per call
+    picks = [random.choice(tokens) for _ in range(calls)]
+    start = time.perf_counter()
+    for token in picks:
+        oauth2.get_current_user(token, None)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.auth")
+    parser.add_argument(
+        "--tokens", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+
+    oauth2.AUTH_MODE = "stateless"
+    print(f"{'tokens':>8}{'cache':>7}{'us/call':>10}{'calls/sec':>12}{'hit rate':>10}")
+    for count in args.tokens:
+        tokens = [
+            oauth2.create_access_token({"user_id": i, "email": f"user{i}@example.com"})
+            for i in range(1, count + 1)
+        ]
+        for size in (0, count):
+            # size the cache to hold the whole working set for the cached run
+            oauth2.token_cache.clear()
+            oauth2.token_cache.maxsize = size
+            if size:
+                for token in tokens:  # warm up
+                    oauth2.get_current_user(token, None)
+            hits = oauth2.JWT_CACHE_HITS._value.get()
+            misses = oauth2.JWT_CACHE_MISSES._value.get()
+            per_call = run(tokens, args.calls)
+            hits = oauth2.JWT_CACHE_HITS._value.get() - hits
+            misses = oauth2.JWT_CACHE_MISSES._value.get() - misses
+            rate = f"{hits / (hits + misses):.0%}" if size else "-"
+            print(
+                f"{count:>8}{'on' if size else 'off':>7}{per_call * 1e6:>10.2f}"
+                f"{1 / per_call:>12,.0f}{rate:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
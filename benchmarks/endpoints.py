@@ -0,0 +1,459 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, NamedTuple
+
+# Load test of every endpoint, in process: httpx.AsyncClient drives the ASGI
+# app through ASGITransport at fixed concurrency levels, so results measure the
+# app and the database, not a network or a server loop. Writes p50/p95/p99 and
+# RPS per endpoint and concurrency as JSON, and exits 1 when a run regresses
+# past a stored baseline.
+#
+# Point DATABASE_* at a disposable Postgres, the --seed run truncates it:
+#   docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=bench postgres:16
+#   python -m benchmarks.endpoints --migrate --seed --save-baseline
+#   python -m benchmarks.endpoints --baseline benchmarks/baseline.json
+#
+# The rate limiter and the in-app trending job are off unless the environment
+# says otherwise, they'd throttle or disturb the measurement.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("TRENDING_REFRESH_INTERVAL", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from apps import trending  # noqa: E402
+from apps.config import settings  # noqa: E402
+from apps.database import engine  # noqa: E402
+from apps.main import app  # noqa: E402
+from .seed import SEED_EMAIL_DOMAIN, SEED_PASSWORD, seed  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+class Request(NamedTuple):
+    method: str
+    url: str
+    kwargs: dict = {}
+
+
+class Scenario(NamedTuple):
+    name: str
+    # builds request i, given whatever setup prepared for it
+    request: Callable[[int, dict], Request]
+    # the one status that counts as success, anything else is an error
+    ok: int = 200
+    # untimed preparation of requests i in range(first, first + count),
+    # returns {i: state} for request()
+    setup: Callable[["Context", range], Awaitable[dict]] | None = None
+
+
+class Context(NamedTuple):
+    http: httpx.AsyncClient
+    # ids that exist when the run starts, and the emails of seeded users
+    post_ids: list[int]
+    emails: dict[int, str]
+    # user id -> bearer headers, for the users that logged in during setup
+    auth: dict[int, dict]
+    # (user id, post id) already voted, including the benchmark's own votes
+    voted: set[tuple[int, int]]
+    # request index -> (headers, post id) voted for it
+    cast: dict[int, tuple[dict, int]]
+
+
+def as_user(ctx: Context, i: int) -> tuple[int, dict]:
+    user_id = list(ctx.auth)[i % len(ctx.auth)]
+    return user_id, ctx.auth[user_id]
+
+
+async def own_posts(ctx: Context, indexes: range) -> dict:
+    # a post owned by a logged in user per request, for update/delete
+    owned = {}
+    for i in indexes:
+        _, headers = as_user(ctx, i)
+        response = await ctx.http.post(
+            "/posts/",
+            json={"title": f"bench {i}", "content": "benchmark post"},
+            headers=headers,
+        )
+        owned[i] = (headers, response.json()["id"])
+    return owned
+
+
+def unvoted_pair(ctx: Context, i: int) -> tuple[dict, int]:
+    # a (user, post) nobody voted yet for request i, so the vote is a fresh one
+    user_id, headers = as_user(ctx, i)
+    for post_id in ctx.post_ids[i % len(ctx.post_ids) :] + ctx.post_ids:
+        if (user_id, post_id) not in ctx.voted:
+            ctx.voted.add((user_id, post_id))
+            return headers, post_id
+    sys.exit(f"user {user_id} voted on every post, reseed with fewer votes")
+
+
+async def new_votes(ctx: Context, indexes: range) -> dict:
+    for i in indexes:
+        if i not in ctx.cast:
+            ctx.cast[i] = unvoted_pair(ctx, i)
+    return {i: ctx.cast[i] for i in indexes}
+
+
+async def cast_votes(ctx: Context, indexes: range) -> dict:
+    # the pairs the "POST /vote/" scenario voted, so these remove them. Pairs it
+    # didn't run for (--only) are voted here first.
+    fresh = [i for i in indexes if i not in ctx.cast]
+    state = await new_votes(ctx, indexes)
+    for i in fresh:
+        headers, post_id = state[i]
+        response = await ctx.http.post(
+            "/vote/", json={"post_id": post_id, "dir": 1}, headers=headers
+        )
+        response.raise_for_status()
+    if fresh and settings.VOTE_WRITE_BEHIND:
+        # let the queue write them before they're removed
+        await asyncio.sleep(settings.VOTE_FLUSH_INTERVAL * 10)
+    return state
+
+
+def scenarios(ctx: Context) -> list[Scenario]:
+    def random_post(i):
+        return random.choice(ctx.post_ids)
+
+    def random_user(i):
+        return random.choice(list(ctx.emails))
+
+    def user_headers(i):
+        return as_user(ctx, i)[1]
+
+    bulk_body = "\n".join(
+        json.dumps({"title": f"bulk {n}", "content": "bulk loaded"}) for n in range(100)
+    )
+    stamp = time.time_ns()
+    # single votes are queued with a 202 under write-behind
+    vote_status = 202 if settings.VOTE_WRITE_BEHIND else 201
+    return [
+        Scenario("GET /", lambda i, s: Request("GET", "/")),
+        Scenario("GET /posts/", lambda i, s: Request("GET", "/posts/")),
+        Scenario(
+            "GET /posts/?limit=100",
+            lambda i, s: Request("GET", "/posts/", {"params": {"limit": 100}}),
+        ),
+        Scenario(
+            "GET /posts/?search=",
+            # common in seeded content, a seeded dataset always has matches
+            lambda i, s: Request("GET", "/posts/", {"params": {"search": "python"}}),
+        ),
+        # needs post_scores filled, --seed refreshes it
+        Scenario("GET /posts/trending", lambda i, s: Request("GET", "/posts/trending")),
+        Scenario(
+            "GET /posts/{id}",
+            lambda i, s: Request("GET", f"/posts/{random_post(i)}"),
+        ),
+        Scenario(
+            "GET /users/{id}",
+            lambda i, s: Request("GET", f"/users/{random_user(i)}"),
+        ),
+        Scenario(
+            "POST /users/",
+            lambda i, s: Request(
+                "POST",
+                "/users/",
+                {
+                    "json": {
+                        "email": f"new{stamp}-{i}@bench.example.com",
+                        "password": "x",
+                    }
+                },
+            ),
+            ok=201,
+        ),
+        Scenario(
+            "POST /auth/login",
+            lambda i, s: Request(
+                "POST",
+                "/auth/login",
+                {
+                    "data": {
+                        "username": ctx.emails[random_user(i)],
+                        "password": SEED_PASSWORD,
+                    }
+                },
+            ),
+        ),
+        Scenario(
+            "POST /posts/",
+            lambda i, s: Request(
+                "POST",
+                "/posts/",
+                {
+                    "json": {"title": f"post {i}", "content": "benchmark"},
+                    "headers": user_headers(i),
+                },
+            ),
+            ok=201,
+        ),
+        Scenario(
+            "PATCH /posts/{id}",
+            lambda i, s: Request(
+                "PATCH",
+                f"/posts/{s[i][1]}",
+                {"json": {"title": f"edited {i}"}, "headers": s[i][0]},
+            ),
+            setup=own_posts,
+        ),
+        Scenario(
+            "DELETE /posts/{id}",
+            lambda i, s: Request("DELETE", f"/posts/{s[i][1]}", {"headers": s[i][0]}),
+            ok=204,
+            setup=own_posts,
+        ),
+        Scenario(
+            "POST /vote/",
+            lambda i, s: Request(
+                "POST",
+                "/vote/",
+                {"json": {"post_id": s[i][1], "dir": 1}, "headers": s[i][0]},
+            ),
+            ok=vote_status,
+            setup=new_votes,
+        ),
+        Scenario(
+            "POST /vote/ (remove)",
+            lambda i, s: Request(
+                "POST",
+                "/vote/",
+                {"json": {"post_id": s[i][1], "dir": 0}, "headers": s[i][0]},
+            ),
+            ok=vote_status,
+            setup=cast_votes,
+        ),
+        Scenario(
+            "POST /vote/batch",
+            lambda i, s: Request(
+                "POST",
+                "/vote/batch",
+                {
+                    "json": {
+                        "votes": [
+                            {"post_id": random_post(i), "dir": random.randint(0, 1)}
+                            for _ in range(20)
+                        ]
+                    },
+                    "headers": user_headers(i),
+                },
+            ),
+        ),
+        Scenario(
+            "POST /posts/bulk",
+            lambda i, s: Request(
+                "POST",
+                "/posts/bulk",
+                {
+                    "content": bulk_body,
+                    "headers": {
+                        **user_headers(i),
+                        "Content-Type": "application/x-ndjson",
+                    },
+                },
+            ),
+            ok=201,
+        ),
+        Scenario(
+            "GET /posts/export",
+            lambda i, s: Request("GET", "/posts/export", {"headers": user_headers(i)}),
+        ),
+        Scenario("GET /metrics", lambda i, s: Request("GET", "/metrics")),
+    ]
+
+
+async def measure(
+    ctx: Context,
+    scenario: Scenario,
+    concurrency: int,
+    requests: int,
+    warmup: int,
+    first: int,
+) -> dict:
+    # request indexes keep counting across concurrency levels, so scenarios
+    # that need a fresh row per request never reuse one
+    indexes = range(first, first + warmup + requests)
+    state = await scenario.setup(ctx, indexes) if scenario.setup else {}
+    for i in indexes[:warmup]:
+        method, url, kwargs = scenario.request(i, state)
+        await ctx.http.request(method, url, **kwargs)
+
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    next_index = iter(indexes[warmup:])
+
+    async def worker():
+        for i in next_index:
+            method, url, kwargs = scenario.request(i, state)
+            start = time.perf_counter()
+            response = await ctx.http.request(method, url, **kwargs)
+            await response.aread()
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != scenario.ok:
+                key = str(response.status_code)
+                errors[key] = errors.get(key, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        # status -> count of responses other than scenario.ok
+        "errors": errors,
+    }
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    # slower p95 or lower RPS than the baseline by more than the tolerance, and
+    # any run with errors: its numbers don't measure the endpoint
+    found = []
+    for name, levels in results.items():
+        for level, now in levels.items():
+            if now["errors"]:
+                found.append(f"{name} @{level}: errors {now['errors']}")
+            then = baseline.get(name, {}).get(level)
+            if then is None:
+                continue
+            if now["rps"] < then["rps"] * (1 - tolerance):
+                found.append(f"{name} @{level}: rps {then['rps']} -> {now['rps']}")
+            if now["p95_ms"] > then["p95_ms"] * (1 + tolerance):
+                found.append(
+                    f"{name} @{level}: p95 {then['p95_ms']}ms -> {now['p95_ms']}ms"
+                )
+    return found
+
+
+async def run(args) -> dict:
+    if args.seed:
+        seed(engine, args.users, args.posts, args.votes)
+        trending.refresh_now(full=True)
+
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport doesn't send lifespan events, run the app's lifespan here
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as http:
+            with engine.connect() as conn:
+                post_ids = list(conn.execute(text("SELECT id FROM posts")).scalars())
+                emails = dict(
+                    conn.execute(
+                        text("SELECT id, email FROM users WHERE email LIKE :seeded"),
+                        {"seeded": f"%@{SEED_EMAIL_DOMAIN}"},
+                    ).all()
+                )
+            if not post_ids or not emails:
+                sys.exit("no seeded users or posts, run with --seed")
+            auth = {}
+            for user_id in sorted(emails)[: args.logins]:
+                response = await http.post(
+                    "/auth/login",
+                    data={"username": emails[user_id], "password": SEED_PASSWORD},
+                )
+                response.raise_for_status()
+                auth[user_id] = {
+                    "Authorization": f"Bearer {response.json()['access_token']}"
+                }
+            with engine.connect() as conn:
+                voted = set(
+                    conn.execute(
+                        text(
+                            "SELECT user_id, post_id FROM votes WHERE user_id = ANY(:ids)"
+                        ),
+                        {"ids": list(auth)},
+                    ).all()
+                )
+            ctx = Context(http, post_ids, emails, auth, voted, {})
+            results = {}
+            for scenario in scenarios(ctx):
+                if args.only and not any(s in scenario.name for s in args.only):
+                    continue
+                results[scenario.name] = {}
+                first = 0
+                for concurrency in args.concurrency:
+                    result = await measure(
+                        ctx, scenario, concurrency, args.requests, args.warmup, first
+                    )
+                    first += args.warmup + args.requests
+                    results[scenario.name][str(concurrency)] = result
+                    print(
+                        f"{scenario.name:<24}c={concurrency:<4}"
+                        f"{result['rps']:>9.1f} rps  p50 {result['p50_ms']:>8.2f}  "
+                        f"p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms"
+                        + (f"  errors {result['errors']}" if result["errors"] else ""),
+                        file=sys.stderr,
+                    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.endpoints")
+    parser.add_argument("--migrate", action="store_true", help="alembic upgrade head")
+    parser.add_argument("--seed", action="store_true", help="truncate and reseed")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--posts", type=int, default=20_000)
+    parser.add_argument("--votes", type=int, default=100_000)
+    parser.add_argument("--logins", type=int, default=20, help="users with tokens")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=500, help="per level")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--only", nargs="+", help="scenario name substrings")
+    parser.add_argument("--output", help="write the JSON report here, default stdout")
+    parser.add_argument("--baseline", help="fail on regressions against this report")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    if args.migrate:
+        from alembic import command
+        from alembic.config import Config
+
+        command.upgrade(Config("alembic.ini"), "head")
+
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "database_async": os.environ.get("DATABASE_ASYNC", "false"),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "dataset": {"users": args.users, "posts": args.posts, "votes": args.votes},
+        },
+        "results": results,
+    }
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+    if args.save_baseline:
+        with open(args.baseline or DEFAULT_BASELINE, "w") as f:
+            f.write(encoded + "\n")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        found = regressions(results, baseline, args.tolerance)
+        if found:
+            print("regressions:\n  " + "\n  ".join(found), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import statistics
+import time
+from sqlalchemy import text
+from apps.database import engine
+from .seed import SEED_EMAIL_DOMAIN, seed
+
+# Compares the hot read/delete queries with and without the indexes from
+# migration a94cc8e3c0f6. Needs a throwaway database: indexes are dropped and
+# rebuilt, and --seed truncates every table first.
+#   python -m benchmarks.indexes --seed --posts 1000000 --votes 5000000
+
+INDEXES = {
+    "ix_votes_post_id": "CREATE INDEX ix_votes_post_id ON votes (post_id)",
+    "ix_posts_owner_id": "CREATE INDEX ix_posts_owner_id ON posts (owner_id)",
+    "ix_posts_created_at_id": (
+        "CREATE INDEX ix_posts_created_at_id ON posts (created_at DESC, id DESC)"
+    ),
+}
+
+QUERIES = {
+    "first page": """
+        SELECT * FROM posts ORDER BY created_at DESC, id DESC LIMIT 11
+    """,
+    "deep page (keyset)": """
+        SELECT * FROM posts
+        WHERE (created_at, id) < (
+            SELECT created_at, id FROM posts ORDER BY id OFFSET :middle LIMIT 1
+        )
+        ORDER BY created_at DESC, id DESC LIMIT 11
+    """,
+    "posts by owner": """
+        SELECT * FROM posts WHERE owner_id = :owner_id
+        ORDER BY created_at DESC, id DESC LIMIT 11
+    """,
+    "votes on a post": """
+        SELECT count(*) FROM votes WHERE post_id = :post_id
+    """,
+    "login lookup": """
+        SELECT * FROM users WHERE email = :email
+    """,
+    # cascades through posts.owner_id and votes.post_id, rolled back afterwards
+    "delete user (cascade)": """
+        DELETE FROM users WHERE id = :owner_id
+    """,
+}
+
+
+def measure(conn, sql: str, params: dict, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = conn.execute(text(sql), params)
+        if result.returns_rows:
+            result.all()
+        timings.append((time.perf_counter() - start) * 1000)
+        conn.rollback()
+    plan = (
+        conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params).scalars().all()
+    )
+    conn.rollback()
+    return {"median_ms": statistics.median(timings), "plan": plan}
+
+
+def run_all(params: dict, runs: int) -> dict:
+    with engine.connect() as conn:
+        return {name: measure(conn, sql, params, runs) for name, sql in QUERIES.items()}
+
+
+def set_indexes(present: bool):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, ddl in INDEXES.items():
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            if present:
+                conn.execute(text(ddl))
+        conn.execute(text("ANALYZE posts, votes"))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.indexes")
+    parser.add_argument("--seed", action="store_true", help="truncate and reseed")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--votes", type=int, default=5_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--plans", action="store_true", help="print full plans")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(engine, args.users, args.posts, args.votes)
+    with engine.connect() as conn:
+        # the busiest post and its owner exercise the worst case of each lookup
+        post_id, owner_id = conn.execute(
+            text("SELECT id, owner_id FROM posts ORDER BY vote_count DESC LIMIT 1")
+        ).one()
+        total = conn.execute(text("SELECT count(*) FROM posts")).scalar_one()
+    params = {
+        "post_id": post_id,
+        "owner_id": owner_id,
+        "middle": total // 2,
+        "email": f"user{owner_id}@{SEED_EMAIL_DOMAIN}",
+    }
+
+    set_indexes(False)
+    before = run_all(params, args.runs)
+    set_indexes(True)
+    after = run_all(params, args.runs)
+
+    print(f"{'query':<24}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in QUERIES:
+        b, a = before[name]["median_ms"], after[name]["median_ms"]
+        print(f"{name:<24}{b:>12.2f}{a:>12.2f}{b / a:>9.1f}x")
+    for name in QUERIES:
+        for label, result in (("before", before[name]), ("after", after[name])):
+            plan = result["plan"] if args.plans else result["plan"][:1]
+            print(f"\n[{name}] {label}")
+            print("\n".join(plan))
+
+
+if __name__ == "__main__":
+    main()
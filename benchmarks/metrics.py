@@ -0,0 +1,28 @@
+import argparse
+import asyncio
+from apps.metrics import MetricsMiddleware
+from .ratelimit import noop_app, run, scope
+
+# Per-request cost of MetricsMiddleware (counter, latency and per-request DB
+# histograms, in-flight gauge) over a no-op ASGI app. No database needed.
+#   python -m benchmarks.metrics --calls 200000
+
+
+async def bench(calls: int):
+    scopes = [scope("GET", "/posts/", [], "10.0.0.1")]
+    baseline = await run(noop_app, scopes, calls)
+    measured = await run(MetricsMiddleware(noop_app), scopes, calls)
+    print(f"{'case':<18}{'us/call':>10}{'overhead us':>14}")
+    print(f"{'no middleware':<18}{baseline * 1e6:>10.2f}{0:>14.2f}")
+    print(f"{'metrics':<18}{measured * 1e6:>10.2f}{(measured - baseline) * 1e6:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.metrics")
+    parser.add_argument("--calls", type=int, default=200_000)
+    args = parser.parse_args()
+    asyncio.run(bench(args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import time
+from apps import oauth2, ratelimit
+
+# Per-request overhead of RateLimitMiddleware with the memory backend, measured
+# by driving the ASGI callables directly against a no-op app so only the
+# middleware is on the clock. No database or server needed.
+#   python -m benchmarks.ratelimit --calls 200000
+
+
+async def noop_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b""}
+
+
+async def send(message):
+    pass
+
+
+def scope(method: str, path: str, headers: list, client: str) -> dict:
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "headers": headers,
+        "client": (client, 50000),
+    }
+
+
+async def run(app, scopes: list[dict], calls: int) -> float:
+    # returns seconds per call
+    start = time.perf_counter()
+    for i in range(calls):
+        await app(scopes[i % len(scopes)], receive, send)
+    return (time.perf_counter() - start) / calls
+
+
+async def bench(calls: int, clients: int):
+    # a bucket big enough that nothing is rejected mid-run
+    rules = [ratelimit.Rule("read", frozenset({"GET"}), "/posts", calls, float(calls))]
+    limited = ratelimit.RateLimitMiddleware(
+        noop_app, ratelimit.MemoryBackend(clients * 2), rules
+    )
+    tokens = [
+        oauth2.create_access_token({"user_id": i, "email": f"user{i}@example.com"})
+        for i in range(clients)
+    ]
+    cases = {
+        "no middleware": (noop_app, [scope("GET", "/posts/", [], "10.0.0.1")]),
+        "unmatched route": (limited, [scope("GET", "/", [], "10.0.0.1")]),
+        "by ip": (
+            limited,
+            [
+                scope("GET", "/posts/", [], f"10.0.{i // 256}.{i % 256}")
+                for i in range(clients)
+            ],
+        ),
+        "by user (jwt)": (
+            limited,
+            [
+                scope(
+                    "GET",
+                    "/posts/",
+                    [(b"authorization", f"Bearer {t}".encode())],
+                    "10.0.0.1",
+                )
+                for t in tokens
+            ],
+        ),
+    }
+    # warm the decoded-token cache, steady state is what the middleware sees
+    await run(*cases["by user (jwt)"], clients)
+    baseline = await run(*cases["no middleware"], calls)
+    print(f"{'case':<18}{'us/call':>10}{'overhead us':>14}")
+    for name, (app, scopes) in cases.items():
+        per_call = await run(app, scopes, calls)
+        print(f"{name:<18}{per_call * 1e6:>10.2f}{(per_call - baseline) * 1e6:>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.ratelimit")
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--clients", type=int, default=1_000)
+    args = parser.parse_args()
+    asyncio.run(bench(args.calls, args.clients))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+from apps.database import engine
+from .indexes import measure
+from .seed import VOCABULARY, seed
+
+# Compares the old ILIKE title filter of GET /posts?search= with the ranked
+# full-text search over posts.search_vector (migration 9ffc5fca790a), for a
+# common and a rare term. --seed truncates every table first.
+#   python -m benchmarks.search --seed --posts 1000000 --votes 0
+
+QUERIES = {
+    "ilike title": """
+        SELECT id FROM posts WHERE title ILIKE '%' || :term || '%'
+        ORDER BY created_at DESC, id DESC LIMIT 11
+    """,
+    "ilike title+content": """
+        SELECT id FROM posts
+        WHERE title ILIKE '%' || :term || '%' OR content ILIKE '%' || :term || '%'
+        ORDER BY created_at DESC, id DESC LIMIT 11
+    """,
+    "fts ranked": """
+        SELECT id, ts_rank(search_vector, q) AS rank
+        FROM posts, websearch_to_tsquery('english', :term) AS q
+        WHERE search_vector @@ q
+        ORDER BY rank DESC, id DESC LIMIT 11
+    """,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.search")
+    parser.add_argument("--seed", action="store_true", help="truncate and reseed")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--votes", type=int, default=0)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--terms", nargs="+", default=[VOCABULARY[3], VOCABULARY[-1]])
+    parser.add_argument("--plans", action="store_true", help="print full plans")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(engine, args.users, args.posts, args.votes)
+    results = {}
+    with engine.connect() as conn:
+        for term in args.terms:
+            for name, sql in QUERIES.items():
+                results[term, name] = measure(conn, sql, {"term": term}, args.runs)
+
+    print(f"{'term':<16}{'query':<24}{'median ms':>12}")
+    for (term, name), result in results.items():
+        print(f"{term:<16}{name:<24}{result['median_ms']:>12.2f}")
+    for (term, name), result in results.items():
+        plan = result["plan"] if args.plans else result["plan"][:1]
+        print(f"\n[{term}] {name}")
+        print("\n".join(plan))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+from sqlalchemy import Engine, text
+from apps import partitions, utils
+from apps.config import settings
+from apps.database import engine
+
+# Seeds synthetic users, posts and votes straight in SQL with generate_series so
+# millions of rows load in seconds. Every seeded user has the password below.
+#   python -m benchmarks.seed --users 10000 --posts 1000000 --votes 5000000
+
+SEED_PASSWORD = "benchmark"
+SEED_EMAIL_DOMAIN = "bench.example.com"
+
+# post content is drawn from these words, skewed towards the front of the list
+# so full-text search sees both very common and rare terms
+VOCABULARY = [
+    "the", "post", "about", "python", "database", "index", "query", "server",
+    "cache", "vote", "async", "latency", "throughput", "postgres", "release",
+    "deploy", "bug", "feature", "review", "search", "ranking", "pagination",
+    "schema", "migration", "worker", "thread", "socket", "kernel", "compiler",
+    "benchmark", "profiler", "allocator", "checkpoint", "replica", "partition",
+    "vacuum", "tokenizer", "lexeme", "dictionary", "stemming", "gardening",
+    "astronomy", "volcano", "saxophone", "origami", "marmalade", "zeppelin",
+]  # fmt: skip
+
+
+def seed(
+    bind: Engine,
+    users: int,
+    posts: int,
+    votes: int,
+    truncate: bool = True,
+):
+    password = utils.hash(SEED_PASSWORD)
+    with bind.begin() as conn:
+        if truncate:
+            conn.execute(
+                text("TRUNCATE votes, post_ids, posts, users RESTART IDENTITY CASCADE")
+            )
+        conn.execute(
+            text(
+                """
+                INSERT INTO users (email, password)
+                SELECT 'user' || i || '@' || :domain, :password
+                FROM generate_series(1, :n) AS i
+                """
+            ),
+            {"n": users, "domain": SEED_EMAIL_DOMAIN, "password": password},
+        )
+        # spread over a year so created_at ordering looks like real traffic, every
+        # month of it needs its posts partition
+        partitions.create_partitions(
+            conn,
+            settings.POSTS_PARTITION_MONTHS_AHEAD,
+            since=partitions.add_months(partitions.this_month(), -12),
+        )
+        conn.execute(
+            text(
+                """
+                INSERT INTO posts (title, content, published, created_at, owner_id)
+                SELECT
+                    'post ' || i || ' ' || (:words)[1 + (i * 7) % cardinality(:words)],
+                    (
+                        SELECT string_agg(
+                            (:words)[1 + (power(random(), 2) * (cardinality(:words) - 1))::int],
+                            ' '
+                        )
+                        FROM generate_series(1, 8 + i % 8)
+                    ),
+                    true,
+                    now() - random() * interval '365 days',
+                    1 + (random() * (:users - 1))::int
+                FROM generate_series(1, :n) AS i
+                """
+            ),
+            {"n": posts, "users": users, "words": VOCABULARY},
+        )
+        # skewed towards recent/low ids so some posts get hot like a real feed
+        conn.execute(
+            text(
+                """
+                INSERT INTO votes (user_id, post_id)
+                SELECT
+                    1 + (random() * (:users - 1))::int,
+                    1 + (power(random(), 3) * (:posts - 1))::int
+                FROM generate_series(1, :n)
+                ON CONFLICT DO NOTHING
+                """
+            ),
+            {"n": votes, "users": users, "posts": posts},
+        )
+        conn.execute(
+            text(
+                """
+                UPDATE posts
+                SET vote_count = counts.n
+                FROM (SELECT post_id, count(*) AS n FROM votes GROUP BY post_id) AS counts
+                WHERE posts.id = counts.post_id
+                """
+            )
+        )
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE users, posts, votes"))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.seed")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--votes", type=int, default=5_000_000)
+    args = parser.parse_args()
+    seed(engine, args.users, args.posts, args.votes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import timeit
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from apps import models, queries, schemas, serializers
+
+# Per-row cost of building a GET /posts page: Pydantic validating ORM entities
+# (the response_model path) against column tuples encoded by orjson.
+#   python -m benchmarks.serialization --sizes 10 100 1000
+
+EntityRow = namedtuple("EntityRow", "Post votes")
+ColumnRow = namedtuple(
+    "ColumnRow",
+    "id title content published created_at owner_id vote_count "
+    "owner_email owner_created_at",
+)
+
+
+def make_rows(size: int):
+    now = datetime.now(timezone.utc)
+    owner = models.User(id=1, email="owner@example.com", created_at=now)
+    entities, columns = [], []
+    for i in range(size):
+        created_at = now - timedelta(minutes=i)
+        title, content = f"post {i}", "lorem ipsum " * 20
+        post = models.Post(
+            id=i,
+            title=title,
+            content=content,
+            published=True,
+            created_at=created_at,
+            owner_id=1,
+            owner=owner,
+        )
+        entities.append(EntityRow(post, i % 50))
+        columns.append(
+            ColumnRow(i, title, content, True, created_at, 1, i % 50, owner.email, now)
+        )
+    return entities, columns
+
+
+def pydantic_page(rows):
+    page = {"data": rows, "next_cursor": None}
+    return schemas.PostPage.model_validate(page).model_dump_json().encode()
+
+
+def orjson_page(rows):
+    return serializers.dumps(queries.page_response(rows, len(rows)))
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6}{'pydantic us/row':>17}{'orjson us/row':>15}{'speedup':>9}")
+    for size in args.sizes:
+        entities, columns = make_rows(size)
+        assert pydantic_page(entities) == orjson_page(columns)
+        number = max(1, 20_000 // size)
+        slow = min(
+            timeit.repeat(
+                lambda: pydantic_page(entities), number=number, repeat=args.repeat
+            )
+        )
+        fast = min(
+            timeit.repeat(
+                lambda: orjson_page(columns), number=number, repeat=args.repeat
+            )
+        )
+        slow, fast = slow / number / size * 1e6, fast / number / size * 1e6
+        print(f"{size:>6}{slow:>17.2f}{fast:>15.2f}{slow / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+# Throughput of `python -m apps.server` as the worker count grows. Starts the
+# server once per worker count and drives it over real HTTP from --clients
+# load processes, so the clients don't share a core with one event loop.
+# Prints requests/s per worker count and the speedup over the first one.
+#   python -m benchmarks.server --workers 1 2 4 --path /
+#   python -m benchmarks.server --workers 1 2 4 --path "/posts/?limit=10"
+# "/" never touches the database, /posts/ needs a seeded one (see
+# benchmarks.seed) and then scales only as far as Postgres does. Keep
+# --clients at or above the largest worker count, the load processes need
+# cores too.
+
+
+async def drive(url: str, concurrency: int, duration: float) -> tuple[int, int]:
+    import httpx
+
+    done = errors = 0
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as http:
+        deadline = time.perf_counter() + duration
+
+        async def loop():
+            nonlocal done, errors
+            while time.perf_counter() < deadline:
+                try:
+                    response = await http.get(url)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                done += 1
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return done, errors
+
+
+def client(args: tuple[str, int, float]) -> tuple[int, int]:
+    return asyncio.run(drive(*args))
+
+
+def wait_ready(url: str, server: subprocess.Popen, timeout: float = 60):
+    import httpx
+
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            sys.exit(f"server exited with {server.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    sys.exit("server did not start")
+
+
+def measure(args, workers: int) -> dict:
+    env = {
+        # the limiter would throttle the load, the trending job disturb it
+        "RATE_LIMIT_ENABLED": "false",
+        "TRENDING_REFRESH_INTERVAL": "0",
+        "LOG_LEVEL": "WARNING",
+        **os.environ,
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "apps.server"]
+        + ["--workers", str(workers), "--host", "127.0.0.1", "--port", str(args.port)],
+        env=env,
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        wait_ready(base + "/", server)
+        url = base + args.path
+        with multiprocessing.Pool(args.clients) as pool:
+            # short warm-up so every worker has its connections and caches
+            pool.map(client, [(url, args.concurrency, 1)] * args.clients)
+            start = time.perf_counter()
+            results = pool.map(
+                client, [(url, args.concurrency, args.duration)] * args.clients
+            )
+            elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    done = sum(r[0] for r in results)
+    return {
+        "workers": workers,
+        "requests": done,
+        "errors": sum(r[1] for r in results),
+        "rps": round(done / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.server")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--concurrency", type=int, default=64, help="connections per load process"
+    )
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    rows = [measure(args, workers) for workers in args.workers]
+    first = rows[0]["rps"] or 1
+    print(f"{args.path} on {os.cpu_count()} cores, {args.clients} load processes")
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'errors':>7}")
+    for row in rows:
+        row["speedup"] = round(row["rps"] / first, 2)
+        print(
+            f"{row['workers']:>8} {row['rps']:>10.1f}"
+            f" {row['speedup']:>7.2f}x {row['errors']:>7}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+# Starts the app under uvicorn once per DATABASE_ASYNC mode and hammers the read
+# endpoints with N concurrent clients. Needs a seeded database, see benchmarks.seed.
+#   python -m benchmarks.sync_vs_async --concurrency 10 50 200 --duration 15
+
+
+async def client(http: httpx.AsyncClient, paths: list[str], deadline: float, out):
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await http.get(paths[i % len(paths)])
+        out.append((time.perf_counter() - start, response.status_code))
+        i += 1
+
+
+async def load(base_url: str, concurrency: int, duration: float) -> dict:
+    paths = ["/posts/", "/posts/?limit=50", "/posts/1", "/users/1"]
+    results: list[tuple[float, int]] = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as http:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(client(http, paths, deadline, results) for _ in range(concurrency))
+        )
+    latencies = sorted(r[0] * 1000 for r in results)
+    errors = sum(1 for r in results if r[1] >= 500)
+    return {
+        "rps": len(results) / duration,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "errors": errors,
+    }
+
+
+def serve(async_mode: bool, port: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_ASYNC": str(async_mode).lower()}
+    command = [sys.executable, "-m", "uvicorn", "apps.main:app", "--port", str(port)]
+    server = subprocess.Popen(command, env=env, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/")
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.sync_vs_async")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'mode':<7}{'clients':>8}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'5xx':>6}")
+    for async_mode in (False, True):
+        server = serve(async_mode, args.port)
+        try:
+            for concurrency in args.concurrency:
+                r = asyncio.run(
+                    load(f"http://127.0.0.1:{args.port}", concurrency, args.duration)
+                )
+                print(
+                    f"{'async' if async_mode else 'sync':<7}{concurrency:>8}"
+                    f"{r['rps']:>10.0f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+                    f"{r['errors']:>6}"
+                )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Synchronous POST /vote/ against VOTE_WRITE_BEHIND, with many users voting on
+# a handful of hot posts. Each mode runs in its own process (settings are read
+# at import) with the app in process behind httpx's ASGITransport. Reports
+# throughput, committed transactions (pg_stat_database) and how many backends
+# were waiting on a lock, sampled from pg_stat_activity. Needs a seeded
+# database, see benchmarks.seed. Every pair is voted and then unvoted, so the
+# benchmark users end up with no votes on the hot posts.
+#   python -m benchmarks.votes --users 50 --hot-posts 20 --concurrency 50
+
+
+def sample_lock_waits(url: str, stop: threading.Event, out: list[int]):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        while not stop.is_set():
+            out.append(
+                conn.execute(
+                    text(
+                        "SELECT count(*) FROM pg_stat_activity"
+                        " WHERE wait_event_type = 'Lock'"
+                    )
+                ).scalar_one()
+            )
+            conn.rollback()
+            stop.wait(0.01)
+    engine.dispose()
+
+
+def commits(conn) -> int:
+    from sqlalchemy import text
+
+    # counters are flushed lazily, give the backends time to report
+    time.sleep(1.5)
+    conn.execute(text("SELECT pg_stat_clear_snapshot()"))
+    return conn.execute(
+        text(
+            "SELECT xact_commit FROM pg_stat_database WHERE datname = current_database()"
+        )
+    ).scalar_one()
+
+
+async def drive(args) -> dict:
+    import httpx
+    from apps.database import SQLALCHEMY_DATABASE_URL, engine
+    from apps.main import app
+    from .seed import SEED_EMAIL_DOMAIN, SEED_PASSWORD
+
+    http = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None
+    )
+    async with app.router.lifespan_context(app):
+        tokens = []
+        for user_id in range(1, args.users + 1):
+            response = await http.post(
+                "/auth/login",
+                data={
+                    "username": f"user{user_id}@{SEED_EMAIL_DOMAIN}",
+                    "password": SEED_PASSWORD,
+                },
+            )
+            response.raise_for_status()
+            tokens.append(
+                {"Authorization": f"Bearer {response.json()['access_token']}"}
+            )
+        # every (user, hot post) pair once per phase: vote, then unvote
+        pairs = [(t, p) for t in tokens for p in range(1, args.hot_posts + 1)]
+
+        with engine.connect() as conn:
+            before = commits(conn)
+        waits: list[int] = []
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=sample_lock_waits, args=(SQLALCHEMY_DATABASE_URL, stop, waits)
+        )
+        sampler.start()
+        start = time.perf_counter()
+        for dir in (1, 0):
+            pending = iter(pairs)
+
+            async def client():
+                for headers, post_id in pending:
+                    await http.post(
+                        "/vote/", json={"post_id": post_id, "dir": dir}, headers=headers
+                    )
+
+            await asyncio.gather(*(client() for _ in range(args.concurrency)))
+            if os.environ.get("VOTE_WRITE_BEHIND") == "true":
+                # let the queue catch up before unvoting the same pairs
+                await asyncio.sleep(args.settle)
+    # leaving the lifespan drains any queued votes
+    elapsed = time.perf_counter() - start
+    stop.set()
+    sampler.join()
+    with engine.connect() as conn:
+        after = commits(conn)
+    return {
+        "votes": len(pairs) * 2,
+        "seconds": round(elapsed, 3),
+        "votes_per_sec": round(len(pairs) * 2 / elapsed, 1),
+        # includes the sampler's and pg_stat reads, same in both modes
+        "commits": after - before,
+        "lock_waiters_mean": round(sum(waits) / max(len(waits), 1), 2),
+        "lock_waiters_max": max(waits, default=0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.votes")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--hot-posts", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--settle", type=float, default=0.5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(drive(args))))
+        return
+
+    print(f"{'mode':<14}{'votes/s':>10}{'commits':>10}{'lock wait avg':>15}{'max':>6}")
+    for write_behind in ("false", "true"):
+        env = {
+            **os.environ,
+            "VOTE_WRITE_BEHIND": write_behind,
+            "RATE_LIMIT_ENABLED": "false",
+            "TRENDING_REFRESH_INTERVAL": "0",
+            "LOG_LEVEL": "WARNING",
+        }
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.votes", "--child", *sys.argv[1:]],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        r = json.loads(output.splitlines()[-1])
+        mode = "write-behind" if write_behind == "true" else "synchronous"
+        print(
+            f"{mode:<14}{r['votes_per_sec']:>10.0f}{r['commits']:>10}"
+            f"{r['lock_waiters_mean']:>15.2f}{r['lock_waiters_max']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+import pytest
+
+# Tests run against a disposable PostgreSQL named by the usual DATABASE_*
+# settings, migrated to head once per run and truncated before every test.
+# Without a reachable database the tests that need one are skipped.
+#   DATABASE_NAME=fastapi_test python -m pytest -q
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("TRENDING_REFRESH_INTERVAL", "0")
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "none")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, exc, text  # noqa: E402
+from apps import models, oauth2  # noqa: E402
+from apps.database import SessionLocal, async_engine, engine  # noqa: E402
+from apps.main import app  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def migrated():
+    try:
+        with engine.connect():
+            pass
+    except exc.OperationalError as e:
+        pytest.skip(f"no database to test against: {e}")
+    # in a child process, alembic's env.py reconfigures logging
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"], cwd=ROOT, check=True
+    )
+
+
+@pytest.fixture
+def db(migrated):
+    with engine.begin() as conn:
+        tables = conn.execute(
+            text(
+                "SELECT string_agg(quote_ident(tablename), ', ') FROM pg_tables"
+                " WHERE schemaname = 'public' AND tablename <> 'alembic_version'"
+            )
+        ).scalar_one()
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def client(db):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def statements():
+    # statements sent to the database by either engine, so the same tests cover
+    # DATABASE_ASYNC. Cleared by the test when it starts measuring.
+    sent = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        sent.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for counted in engines:
+        event.listen(counted, "before_cursor_execute", count)
+    yield sent
+    for counted in engines:
+        event.remove(counted, "before_cursor_execute", count)
+
+
+def make_user(db, email: str) -> models.User:
+    # the hash is never checked, tests that log in create users through the API
+    user = models.User(email=email, password="not-a-hash")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_posts(db, owner: models.User, *contents: str, title: str = "post"):
+    # one second apart, newest last, so the feed order is predictable
+    start = datetime.now(timezone.utc) - timedelta(seconds=len(contents))
+    posts = [
+        models.Post(
+            title=title,
+            content=content,
+            # the migrations never gave posts.published a server default
+            published=True,
+            owner_id=owner.id,
+            created_at=start + timedelta(seconds=i),
+        )
+        for i, content in enumerate(contents)
+    ]
+    db.add_all(posts)
+    db.commit()
+    return posts
+
+
+def auth_headers(user: models.User) -> dict:
+    token = oauth2.create_access_token({"user_id": user.id, "email": user.email})
+    return {"Authorization": f"Bearer {token}"}
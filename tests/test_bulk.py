@@ -0,0 +1,94 @@
+import orjson
+import pytest
+from apps import models
+from apps.bulk import JSONArrayItems
+from apps.config import settings
+from .conftest import auth_headers, make_user
+
+
+def split(body: bytes, size: int) -> list[bytes]:
+    splitter = JSONArrayItems()
+    items = []
+    for i in range(0, len(body), size):
+        items += splitter.feed(body[i : i + size])
+    splitter.close()
+    return items
+
+
+ELEMENTS = [
+    {"title": "a, b", "content": "]"},
+    {"title": 'say "hi"', "content": "[not an array"},
+    {"title": "back\\slash\\", "content": 'quote\\" ] , ['},
+    {"title": "é\n\t", "content": "{}"},
+    [1, [2, {"x": "]"}]],
+    "plain",
+    3,
+]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1 << 16])
+def test_splits_elements_across_any_chunk_boundary(size):
+    # size 1 puts a boundary right after every backslash and quote
+    body = b"  [ " + b" ,\n".join(orjson.dumps(e) for e in ELEMENTS) + b" ]\n "
+    assert [orjson.loads(item) for item in split(body, size)] == ELEMENTS
+
+
+@pytest.mark.parametrize("body", [b"[]", b" [ ] ", b"[\n]"])
+def test_empty_array(body):
+    assert split(body, 1) == []
+
+
+@pytest.mark.parametrize(
+    "body, error",
+    [
+        (b"not json", "expected a JSON array"),
+        (b"", "expected a JSON array"),
+        (b'{"title": "x"}', "expected a JSON array"),
+        (b"[1, 2", "truncated JSON array"),
+        (b'["a]', "truncated JSON array"),
+        (b"[1,,2]", "missing JSON array element at index 1"),
+        (b"[,1]", "missing JSON array element at index 0"),
+        (b"[1,]", "missing JSON array element at index 1"),
+        (b"[1] 2", "unexpected data after the JSON array"),
+        (b"[1][2]", "unexpected data after the JSON array"),
+    ],
+)
+def test_malformed_arrays(body, error):
+    for size in (1, len(body) or 1):
+        with pytest.raises(ValueError, match=error):
+            split(body, size)
+
+
+def test_trailing_data_in_a_later_chunk():
+    splitter = JSONArrayItems()
+    assert splitter.feed(b"[1]") == [b"1"]
+    assert splitter.feed(b"  \n") == []
+    with pytest.raises(ValueError, match="unexpected data"):
+        splitter.feed(b"x")
+
+
+def test_body_that_is_not_an_array_is_a_400(client, db):
+    user = make_user(db, "bulk@example.com")
+    response = client.post(
+        "/posts/bulk", content=b"not json", headers=auth_headers(user)
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "expected a JSON array"
+    assert db.query(models.Post).count() == 0
+
+
+def test_error_after_loaded_chunks_keeps_the_partial_result(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "POSTS_BULK_CHUNK_SIZE", 2)
+    user = make_user(db, "bulk@example.com")
+    posts = b",".join(
+        orjson.dumps({"title": f"t{n}", "content": "c"}) for n in range(3)
+    )
+    response = client.post(
+        "/posts/bulk", content=b"[" + posts, headers=auth_headers(user)
+    )
+    assert response.status_code == 201
+    body = response.json()
+    assert body["error"] == "truncated JSON array"
+    # the last element never ended, so it wasn't loaded
+    assert body["inserted"] == 2
+    assert db.query(models.Post).count() == 2
@@ -0,0 +1,76 @@
+import csv
+import io
+import orjson
+import pytest
+from apps import models
+from apps.config import settings
+from .conftest import auth_headers, make_posts, make_user
+
+TRICKY = 'a "quoted", comma\nand newline'
+
+
+@pytest.fixture
+def authors(db, monkeypatch):
+    # several fetches per export
+    monkeypatch.setattr(settings, "POSTS_EXPORT_BATCH_SIZE", 2)
+    me = make_user(db, "me@example.com")
+    other = make_user(db, "other@example.com")
+    mine = make_posts(db, me, "one", TRICKY, "three", "four", "five")
+    theirs = make_posts(db, other, "not mine")
+    db.add_all(
+        [
+            models.Vote(user_id=me.id, post_id=theirs[0].id),
+            models.Vote(user_id=me.id, post_id=mine[0].id),
+            models.Vote(user_id=other.id, post_id=mine[1].id),
+        ]
+    )
+    db.commit()
+    return me, [post.id for post in mine], theirs[0].id
+
+
+def export(client, user, **params):
+    return client.get("/posts/export", params=params, headers=auth_headers(user))
+
+
+def test_ndjson_exports_only_my_posts(client, authors):
+    me, mine, _ = authors
+    response = export(client, me)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert (
+        response.headers["content-disposition"] == 'attachment; filename="posts.ndjson"'
+    )
+    rows = [orjson.loads(line) for line in response.content.splitlines()]
+    assert [row["id"] for row in rows] == mine
+    assert {row["owner_id"] for row in rows} == {me.id}
+    assert rows[1]["content"] == TRICKY
+
+
+def test_csv_has_a_header_and_escapes_values(client, authors):
+    me, mine, _ = authors
+    response = export(client, me, format="csv")
+    assert response.headers["content-type"].startswith("text/csv")
+    header, *rows = csv.reader(io.StringIO(response.text))
+    assert header == [
+        "id",
+        "title",
+        "content",
+        "published",
+        "created_at",
+        "owner_id",
+        "vote_count",
+    ]
+    assert [int(row[0]) for row in rows] == mine
+    assert rows[1][2] == TRICKY
+
+
+def test_votes_export_only_my_votes(client, authors):
+    me, mine, theirs = authors
+    response = export(client, me, dataset="votes", format="csv")
+    header, *rows = csv.reader(io.StringIO(response.text))
+    assert header == ["user_id", "post_id"]
+    assert rows == [[str(me.id), str(post_id)] for post_id in sorted([mine[0], theirs])]
+
+
+def test_export_needs_a_login(client, db):
+    assert client.get("/posts/export").status_code == 401
@@ -0,0 +1,77 @@
+import csv
+import gzip
+from datetime import timedelta
+from sqlalchemy import text
+from apps import models, partitions
+from apps.database import engine
+from .conftest import make_posts, make_user
+
+
+def read_csv(path: str) -> list[dict]:
+    with gzip.open(path, "rt") as f:
+        return list(csv.DictReader(f))
+
+
+def test_archive_partition(db, tmp_path):
+    old_month = partitions.add_months(partitions.this_month(), -14)
+    with engine.begin() as conn:
+        partitions.create_partitions(conn, 0, since=old_month)
+    owner = make_user(db, "owner@example.com")
+    voter = make_user(db, "voter@example.com")
+    old = models.Post(
+        title="old",
+        content="archived",
+        published=True,
+        owner_id=owner.id,
+        created_at=f"{old_month + timedelta(days=1)} 12:00+00",
+    )
+    db.add(old)
+    db.commit()
+    old_id = old.id
+    recent_id = make_posts(db, owner, "kept")[0].id
+    db.add_all(
+        [
+            models.Vote(user_id=voter.id, post_id=old_id),
+            models.Vote(user_id=owner.id, post_id=old_id),
+            models.Vote(user_id=voter.id, post_id=recent_id),
+            models.PostScore(post_id=old_id, score=1, vote_count=2),
+        ]
+    )
+    db.commit()
+
+    name = partitions.partition_name(old_month)
+    with engine.connect() as conn:
+        assert name in partitions.cold_partitions(conn, 12)
+    posts_path, votes_path = partitions.archive_partition(name, str(tmp_path))
+
+    assert [row["id"] for row in read_csv(posts_path)] == [str(old_id)]
+    assert sorted(row["user_id"] for row in read_csv(votes_path)) == sorted(
+        [str(voter.id), str(owner.id)]
+    )
+    with engine.connect() as conn:
+        assert name not in partitions.post_partitions(conn).values()
+        assert (
+            conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+            is None
+        )
+        left = conn.execute(
+            text(
+                "SELECT (SELECT count(*) FROM posts), (SELECT count(*) FROM post_ids),"
+                " (SELECT count(*) FROM votes), (SELECT count(*) FROM post_scores)"
+            )
+        ).one()
+    assert tuple(left) == (1, 1, 1, 0)
+
+
+def test_post_ids_follow_posts(db):
+    owner = make_user(db, "owner@example.com")
+    post = make_posts(db, owner, "gone soon")[0]
+    db.add(models.Vote(user_id=owner.id, post_id=post.id))
+    db.commit()
+    db.delete(post)
+    db.commit()
+    with engine.connect() as conn:
+        counts = conn.execute(
+            text("SELECT (SELECT count(*) FROM post_ids), (SELECT count(*) FROM votes)")
+        ).one()
+    assert tuple(counts) == (0, 0)
@@ -0,0 +1,43 @@
+import os
+import signal
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from fastapi import HTTPException
+from apps import utils
+
+
+@pytest.fixture
+def pool():
+    yield
+    utils.shutdown_executor()
+
+
+def test_dead_worker_is_replaced(pool):
+    hashed = utils.hash_password("secret")
+    executor = utils._get_executor()
+    worker = next(iter(executor._processes.values()))
+    os.kill(worker.pid, signal.SIGKILL)
+    worker.join()
+
+    assert utils.verify_password("secret", utils.hash_password("secret"))[0]
+    assert utils.verify_password("secret", hashed)[0]
+    assert utils._get_executor() is not executor
+
+
+class BrokenExecutor:
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self, **kw):
+        pass
+
+
+def test_pool_that_stays_broken_is_a_503(pool, monkeypatch):
+    monkeypatch.setattr(utils, "_get_executor", BrokenExecutor)
+    with pytest.raises(HTTPException) as raised:
+        utils.hash_password("secret")
+    assert raised.value.status_code == 503
+    # no slot leaked
+    assert utils._slots._value == (
+        utils.settings.PASSWORD_HASH_WORKERS + utils.settings.PASSWORD_HASH_QUEUE_SIZE
+    )
@@ -0,0 +1,37 @@
+from .conftest import make_posts, make_user
+
+
+def seed(db, count: int):
+    users = [make_user(db, f"owner{i}@example.com") for i in range(3)]
+    posts = []
+    for i in range(count):
+        posts += make_posts(db, users[i % len(users)], f"content {i}")
+    return posts
+
+
+def test_post_list_statement_count_does_not_grow_with_page_size(client, db, statements):
+    seed(db, 30)
+    # the first request opens the pool connection and runs dialect setup
+    client.get("/posts/?limit=1")
+
+    counts = []
+    for limit in (5, 25):
+        statements.clear()
+        response = client.get(f"/posts/?limit={limit}")
+        assert response.status_code == 200
+        assert len(response.json()["data"]) == limit
+        assert all(post["Post"]["owner"]["email"] for post in response.json()["data"])
+        counts.append(len(statements))
+
+    assert counts == [1, 1]
+
+
+def test_post_by_id_statement_count(client, db, statements):
+    post_id = seed(db, 3)[0].id
+    client.get("/posts/?limit=1")
+
+    statements.clear()
+    response = client.get(f"/posts/{post_id}")
+    assert response.status_code == 200
+    assert response.json()["Post"]["owner"]["email"] == "owner0@example.com"
+    assert len(statements) == 1
@@ -0,0 +1,14 @@
+import pytest
+from apps.ratelimit import parse_rule
+
+
+def test_parse_rule():
+    rule = parse_rule("read", "GET", "/posts", "300/60")
+    assert (rule.capacity, rule.rate) == (300, 5)
+    assert parse_rule("read", "GET", "/posts", "") is None
+
+
+@pytest.mark.parametrize("spec", ["10/0", "0/60", "10", "ten/60", "10/-1"])
+def test_parse_rule_rejects_bad_specs(spec):
+    with pytest.raises(ValueError, match="RATE_LIMIT_READ"):
+        parse_rule("read", "GET", "/posts", spec)
@@ -0,0 +1,91 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from apps import response_cache
+from apps.database import SQLALCHEMY_DATABASE_URL, async_engine, engine
+from apps.replicas import Replica, ReplicaSet, RoutingSession
+
+
+def replica_set(url: str) -> ReplicaSet:
+    url = make_url(url)
+    replica = Replica(
+        "replica0",
+        create_engine(url, connect_args={"connect_timeout": 1}),
+        create_async_engine(
+            url.set(drivername="postgresql+psycopg"),
+            connect_args={"connect_timeout": 1},
+        ),
+    )
+    return ReplicaSet([replica], "round_robin")
+
+
+# nothing listens on port 1
+DOWN = make_url(SQLALCHEMY_DATABASE_URL).set(host="127.0.0.1", port=1)
+
+
+def test_down_replica_falls_back_to_primary(migrated):
+    replicas = replica_set(DOWN)
+    with RoutingSession(replicas=replicas, bind=engine) as db:
+        assert db.execute(text("SELECT 1")).scalar_one() == 1
+        assert db.get_bind() is engine
+    assert not replicas.replicas[0].healthy
+
+
+def test_down_replica_falls_back_to_primary_async(migrated):
+    replicas = replica_set(DOWN)
+    sessions = async_sessionmaker(
+        async_engine, sync_session_class=RoutingSession, replicas=replicas
+    )
+
+    async def read():
+        async with sessions(use_async=True) as db:
+            assert (await db.execute(text("SELECT 1"))).scalar_one() == 1
+            assert db.sync_session.get_bind() is async_engine.sync_engine
+        await async_engine.dispose()
+
+    asyncio.run(read())
+    assert not replicas.replicas[0].healthy
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(response_cache, "backend", response_cache.MemoryBackend(64))
+    monkeypatch.setattr(response_cache, "READS_FROM_REPLICAS", True)
+    monkeypatch.setattr(response_cache, "REPLICA_LAG_WINDOW", 15)
+
+
+def reads_primary(generation: str) -> bool:
+    replicas = replica_set(SQLALCHEMY_DATABASE_URL)
+    try:
+        with RoutingSession(replicas=replicas, bind=engine) as db:
+            response_cache.fill_from_primary(db, generation)
+            return db.get_bind() is engine
+    finally:
+        replicas.replicas[0].engine.dispose()
+
+
+def test_cache_misses_stay_on_replicas_without_recent_writes(migrated, cache):
+    assert not reads_primary(response_cache.LISTS)
+    assert not reads_primary(response_cache.item_generation(1))
+
+
+def test_cache_misses_after_a_write_read_the_primary(migrated, cache):
+    response_cache.invalidate_votes([1])
+    assert reads_primary(response_cache.item_generation(1))
+    assert not reads_primary(response_cache.item_generation(2))
+    # votes leave list pages alone
+    assert not reads_primary(response_cache.LISTS)
+    response_cache.invalidate_post()
+    assert reads_primary(response_cache.LISTS)
+
+
+def test_unbounded_lag_reads_every_miss_from_the_primary(migrated, cache, monkeypatch):
+    monkeypatch.setattr(response_cache, "REPLICA_LAG_WINDOW", 0)
+    assert reads_primary(response_cache.LISTS)
+
+
+def test_nothing_cached_reads_replicas(migrated, cache, monkeypatch):
+    monkeypatch.setattr(response_cache, "backend", response_cache.NullBackend())
+    monkeypatch.setattr(response_cache, "REPLICA_LAG_WINDOW", 0)
+    assert not reads_primary(response_cache.LISTS)
@@ -0,0 +1,94 @@
+import pytest
+from apps import response_cache
+from apps.response_cache import MemoryBackend, RedisBackend
+
+
+class FakeRedis:
+    # the part of redis-py's client RedisBackend uses, without expiry
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.ttls: dict[str, int] = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.ttls[key] = ex
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def expire(self, key, ttl):
+        self.ttls[key] = ttl
+
+
+@pytest.fixture(params=["redis", "memory"])
+def backend(request, monkeypatch):
+    if request.param == "redis":
+        backend = RedisBackend(FakeRedis())
+    else:
+        backend = MemoryBackend(100)
+    monkeypatch.setattr(response_cache, "backend", backend)
+    return backend
+
+
+def test_store_and_lookup(backend):
+    key = response_cache.post_key(1)
+    stored = response_cache.store(key, b'{"id": 1}')
+    assert response_cache.lookup(key) == stored
+    assert response_cache.respond(stored, stored.etag).status_code == 304
+    assert response_cache.respond(stored, '"other"').body == b'{"id": 1}'
+
+
+def test_stale_store_after_invalidation_is_never_read(backend):
+    # a reader picks its key, loads the old row, and stores it after the write
+    key = response_cache.post_key(1)
+    response_cache.invalidate_post(1)
+    response_cache.store(key, b"old")
+    assert response_cache.lookup(response_cache.post_key(1)) is None
+
+
+def test_votes_invalidate_items_but_not_lists(backend):
+    list_key = response_cache.post_list_key(limit=10)
+    voted, other = response_cache.post_key(1), response_cache.post_key(2)
+    response_cache.invalidate_votes([1])
+    assert response_cache.post_list_key(limit=10) == list_key
+    assert response_cache.post_key(1) != voted
+    assert response_cache.post_key(2) == other
+
+
+def test_writes_invalidate_lists(backend):
+    list_key = response_cache.post_list_key(limit=10)
+    response_cache.invalidate_post()
+    created = response_cache.post_list_key(limit=10)
+    assert created != list_key
+    response_cache.invalidate_post(2)
+    assert response_cache.post_list_key(limit=10) != created
+
+
+def test_item_generations_expire_after_their_entries():
+    client = FakeRedis()
+    backend = RedisBackend(client)
+    backend.bump(response_cache.item_generation(1), response_cache.ITEM_GENERATION_TTL)
+    assert client.ttls[response_cache.item_generation(1)] > (
+        response_cache.settings.RESPONSE_CACHE_TTL
+    )
+
+
+def test_memory_generation_never_goes_back_after_eviction():
+    backend = MemoryBackend(2)
+    before = backend.generation("a")
+    backend.bump("a")
+    bumped = backend.generation("a")
+    assert bumped > before
+    for key in ("b", "c", "d"):
+        backend.bump(key)
+    # "a" was evicted, reading a generation from before its bump would find the
+    # entries its invalidation was meant to hide
+    assert backend.generation("a") >= bumped
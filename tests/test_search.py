@@ -0,0 +1,70 @@
+from .conftest import make_posts, make_user
+
+
+def search(client, query: str, limit: int = 10, cursor: str | None = None):
+    params = {"search": query, "limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    response = client.get("/posts/", params=params)
+    return response
+
+
+def contents(page: dict) -> list[str]:
+    return [post["Post"]["content"] for post in page["data"]]
+
+
+def seed(db):
+    owner = make_user(db, "author@example.com")
+    make_posts(
+        db,
+        owner,
+        "postgres tuning notes, more postgres later",
+        "postgres postgres postgres, all about postgres",
+        "a post about cooking",
+        "postgres once, then many other words about other databases and caching",
+    )
+    # title matches outrank content matches
+    make_posts(db, owner, "an unrelated body", title="Postgres in production")
+
+
+def test_search_orders_by_relevance(client, db):
+    seed(db)
+    page = search(client, "postgres").json()
+    assert contents(page) == [
+        "an unrelated body",
+        "postgres postgres postgres, all about postgres",
+        "postgres tuning notes, more postgres later",
+        "postgres once, then many other words about other databases and caching",
+    ]
+    assert page["next_cursor"] is None
+
+
+def test_search_without_matches_is_404(client, db):
+    seed(db)
+    assert search(client, "kubernetes").status_code == 404
+
+
+def test_search_cursor_continues_in_rank_order(client, db):
+    seed(db)
+    expected = contents(search(client, "postgres").json())
+    seen, cursor = [], None
+    while True:
+        page = search(client, "postgres", limit=1, cursor=cursor).json()
+        seen += contents(page)
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == expected
+
+
+def test_search_cursor_breaks_rank_ties_by_id(client, db):
+    owner = make_user(db, "author@example.com")
+    ids = [post.id for post in make_posts(db, owner, *["same words"] * 5)]
+    seen, cursor = [], None
+    while True:
+        page = search(client, "words", limit=2, cursor=cursor).json()
+        seen += [post["Post"]["id"] for post in page["data"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == sorted(ids, reverse=True)
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, update
+from apps import models, partitions, trending
+from apps.config import settings
+from apps.database import engine
+from .conftest import make_posts, make_user
+
+
+@pytest.fixture(autouse=True)
+def exponential(monkeypatch):
+    # the default, the only decay that allows incremental refreshes
+    monkeypatch.setattr(settings, "TRENDING_DECAY", "exponential")
+
+
+def set_votes(db, counts: dict[int, int]):
+    for post_id, count in counts.items():
+        db.execute(
+            update(models.Post)
+            .where(models.Post.id == post_id)
+            .values(vote_count=count)
+        )
+    db.commit()
+
+
+def scored(db) -> dict[int, int]:
+    db.expire_all()
+    rows = db.execute(select(models.PostScore.post_id, models.PostScore.vote_count))
+    return dict(rows.all())
+
+
+def test_incremental_refresh_rescores_only_changed_posts(db):
+    owner = make_user(db, "owner@example.com")
+    a, b, c = (post.id for post in make_posts(db, owner, "a", "b", "c"))
+    assert trending.refresh_now() == 3
+    assert scored(db) == {a: 0, b: 0, c: 0}
+
+    assert trending.refresh_now() == 0
+    set_votes(db, {b: 2})
+    assert trending.refresh_now() == 1
+    assert scored(db) == {a: 0, b: 2, c: 0}
+
+    d = make_posts(db, owner, "d")[0].id
+    assert trending.refresh_now() == 1
+    assert trending.refresh_now(full=True) == 4
+    assert scored(db) == {a: 0, b: 2, c: 0, d: 0}
+
+
+def test_posts_outside_the_window_drop_out(db):
+    with engine.begin() as conn:
+        partitions.create_partitions(
+            conn, 0, since=partitions.add_months(partitions.this_month(), -1)
+        )
+    owner = make_user(db, "owner@example.com")
+    fresh = make_posts(db, owner, "fresh")[0].id
+    old = models.Post(
+        title="post",
+        content="old",
+        published=True,
+        owner_id=owner.id,
+        created_at=datetime.now(timezone.utc)
+        - timedelta(days=settings.TRENDING_WINDOW_DAYS, hours=1),
+    )
+    db.add(old)
+    db.commit()
+    # scored back when it was still inside the window
+    db.add(models.PostScore(post_id=old.id, score=100, vote_count=0))
+    db.commit()
+
+    assert trending.refresh_now() == 1
+    assert scored(db) == {fresh: 0}
+
+
+def test_trending_pages_in_score_order(client, db):
+    owner = make_user(db, "owner@example.com")
+    posts = [post.id for post in make_posts(db, owner, "a", "b", "c", "d", "e")]
+    # each doubling of votes outweighs the second between two posts
+    set_votes(db, dict(zip(posts, [3, 0, 15, 7, 1])))
+    trending.refresh_now()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2} | ({"cursor": cursor} if cursor else {})
+        page = client.get("/posts/trending", params=params).json()
+        seen += [post["Post"]["content"] for post in page["data"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["c", "d", "a", "e", "b"]
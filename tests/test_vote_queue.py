@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from apps import models
+from apps.metrics import VOTES_DROPPED
+from apps.vote_queue import VoteQueue
+from .conftest import make_posts, make_user
+
+
+def dropped() -> float:
+    return VOTES_DROPPED._value.get()
+
+
+def test_flush_drops_only_the_bad_vote(db):
+    voter = make_user(db, "voter@example.com")
+    post_ids = [post.id for post in make_posts(db, voter, "a", "b", "c")]
+    missing_user = voter.id + 1000
+    batch = {(voter.id, post_ids[0]): 1, (missing_user, post_ids[1]): 1}
+    batch[voter.id, post_ids[2]] = 1
+    before = dropped()
+
+    asyncio.run(VoteQueue(10, 10, 0.01).flush(batch))
+
+    db.expire_all()
+    voted = {vote.post_id for vote in db.query(models.Vote)}
+    assert voted == {post_ids[0], post_ids[2]}
+    assert [db.get(models.Post, id).vote_count for id in post_ids] == [1, 0, 1]
+    assert dropped() == before + 1
+
+
+def test_submit_refuses_votes_once_the_flusher_died():
+    async def scenario():
+        queue = VoteQueue(10, 10, 0.01)
+        queue.start()
+        queue._flusher.cancel()
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as error:
+            queue.submit(1, 1, 1)
+        assert error.value.status_code == 503
+
+    asyncio.run(scenario())
@@ -0,0 +1,134 @@
+from sqlalchemy import literal, select
+from apps import models, queries
+from .conftest import auth_headers, make_posts, make_user
+
+
+def vote_count(db, post_id: int) -> int:
+    db.expire_all()
+    return db.get(models.Post, post_id).vote_count
+
+
+def test_vote_and_unvote_keep_vote_count(client, db):
+    voter = make_user(db, "voter@example.com")
+    post_id = make_posts(db, voter, "hello")[0].id
+    headers = auth_headers(voter)
+
+    assert (
+        client.post(
+            "/vote/", json={"post_id": post_id, "dir": 1}, headers=headers
+        ).status_code
+        == 201
+    )
+    assert vote_count(db, post_id) == 1
+    assert (
+        client.post(
+            "/vote/", json={"post_id": post_id, "dir": 0}, headers=headers
+        ).status_code
+        == 201
+    )
+    assert vote_count(db, post_id) == 0
+    assert (
+        client.post(
+            "/vote/", json={"post_id": post_id, "dir": 0}, headers=headers
+        ).status_code
+        == 404
+    )
+    assert vote_count(db, post_id) == 0
+
+
+def test_unvote_losing_a_race_does_not_decrement(client, db, monkeypatch):
+    voter = make_user(db, "voter@example.com")
+    post_id = make_posts(db, voter, "hello")[0].id
+
+    # the state check saw the vote, a concurrent unvote deleted it before ours
+    def seen_voted(post_id, user_id):
+        return select(literal(post_id).label("id"), literal(user_id).label("voted"))
+
+    monkeypatch.setattr(queries, "vote_state", seen_voted)
+    response = client.post(
+        "/vote/", json={"post_id": post_id, "dir": 0}, headers=auth_headers(voter)
+    )
+    assert response.status_code == 404
+    assert vote_count(db, post_id) == 0
+
+
+def voted(db, user_id: int) -> set[int]:
+    db.expire_all()
+    return set(
+        db.scalars(select(models.Vote.post_id).where(models.Vote.user_id == user_id))
+    )
+
+
+def test_batch_reports_each_item(client, db):
+    voter = make_user(db, "voter@example.com")
+    fresh, liked, untouched, unliked = (
+        post.id for post in make_posts(db, voter, "a", "b", "c", "d")
+    )
+    for post_id in (liked, unliked):
+        db.add(models.Vote(user_id=voter.id, post_id=post_id))
+        db.get(models.Post, post_id).vote_count = 1
+    db.commit()
+    missing = unliked + 1000
+
+    items = [
+        (fresh, 1),
+        (fresh, 0),
+        (liked, 1),
+        (untouched, 0),
+        (missing, 1),
+        (unliked, 0),
+        (fresh, 1),
+    ]
+    response = client.post(
+        "/vote/batch",
+        json={"votes": [{"post_id": p, "dir": d} for p, d in items]},
+        headers=auth_headers(voter),
+    )
+    assert response.status_code == 200
+    assert [r["result"] for r in response.json()["results"]] == [
+        "superseded",
+        "superseded",
+        "already_voted",
+        "not_voted",
+        "post_not_found",
+        "removed",
+        "added",
+    ]
+    assert [(r["post_id"], r["dir"]) for r in response.json()["results"]] == items
+    assert voted(db, voter.id) == {fresh, liked}
+    assert [vote_count(db, p) for p in (fresh, liked, untouched, unliked)] == [
+        1,
+        1,
+        0,
+        0,
+    ]
+
+
+def test_batch_duplicates_apply_only_the_last_item(client, db):
+    voter = make_user(db, "voter@example.com")
+    post_id = make_posts(db, voter, "hello")[0].id
+
+    response = client.post(
+        "/vote/batch",
+        json={"votes": [{"post_id": post_id, "dir": d} for d in (1, 1, 0)]},
+        headers=auth_headers(voter),
+    )
+    assert [r["result"] for r in response.json()["results"]] == [
+        "superseded",
+        "superseded",
+        "not_voted",
+    ]
+    assert voted(db, voter.id) == set()
+    assert vote_count(db, post_id) == 0
+
+    # voting twice in one batch counts once
+    response = client.post(
+        "/vote/batch",
+        json={"votes": [{"post_id": post_id, "dir": 1}] * 2},
+        headers=auth_headers(voter),
+    )
+    assert [r["result"] for r in response.json()["results"]] == [
+        "superseded",
+        "added",
+    ]
+    assert vote_count(db, post_id) == 1